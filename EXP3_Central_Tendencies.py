@@ -27,65 +27,462 @@ In simpler terms:
 Mean: Like finding the average score in a class.
 Median: The middle value when you line up all the values.
 Mode: The value that appears most often.
+
+Streaming Engine (engine = 'stream'):
+
+Read the file in chunks instead of loading every value into a list.
+Mean: add the exact sum of each chunk to a running total with Kahan (compensated) summation and divide by the count.
+Mode: count the values of each chunk and merge the counts into one table.
+Median (exact): each pass over the file builds a histogram of the value range that still holds the middle rank
+and narrows the range to the bin containing it. Once the range holds few enough values they are counted and the
+middle rank is read off directly.
+Median (approx): feed every chunk into a KLL quantile sketch and read the middle rank from it.
+Memory stays flat however large the file is: the mode table is dropped once it holds more than memory_budget
+distinct values, and the mode is then reported as not available.
+While the mode table is kept the exact median is read from it without extra passes; once it has been dropped
+the exact median comes from the histogram passes above.
+
+Parallel Engine (engine = 'parallel'):
+
+Build one summary (count, sum, sum of squared deviations M2, frequency table and quantile sketch) per shard file,
+or per chunk of a single file, on a process pool.
+Merge the summaries: counts, sums and frequency tables add up, M2 combines with the pairwise (Chan) update
+M2 = M2_a + M2_b + (mean_b - mean_a)^2 * n_a * n_b / n, and the sketches merge level by level.
+Read the mean, median and mode from the merged summary.
+The frequency tables are capped at memory_budget distinct values, so workers never send back a table of the whole
+column; past the cap the mode is reported as not available and the median is read from the sketch.
+
+NumPy Engine (engine = 'numpy'):
+
+Keep the values in a NumPy array instead of a list and never sort it.
+Median: select the middle rank(s) with one np.partition call (linear-time selection).
+Mode: count the values with np.bincount when they are integers in a narrow range, else with np.unique.
+Benchmark (engine = 'benchmark'): time the list and NumPy engines on random data of each size in benchmark_sizes.
 ----------------------------------------------------------------------------------
 '''
 
+import math
+import time
+from collections import Counter
+from functools import partial
+from multiprocessing import Pool
+
+import numpy as np
 import pandas as pd
 
-# Initialize variables to store mean, median, and mode
-mean,median,mode=0,0,0
-# Initialize an empty dictionary to store the frequency of each value for mode calculation
-d={}
-
-# Read data from the CSV file named 'Central_Tendencies.csv' located in the 'Data' folder
-data = pd.read_csv('Data\Central_Tendencies.csv')
-
-# Extract the values from the 'Values' column of the DataFrame and store them in a list called 'values'
-values = data['Values'].tolist()
-
-# Print the unsorted list of values
-print(values)
-
-# Sort the values in ascending order to facilitate median and mode calculation
-values.sort()
-
-# Calculate the median of the sorted values
-if len(values) % 2 == 0:
-    # If the number of values is even, the median is the average of the two middle values
-    median = (values[len(values)//2]+values[len(values)//2+1])//2
-else:
-    # If the number of values is odd, the median is the middle value
-    median = values[len(values)//2]
-
-# Calculate the mean of the values
-for val in values:
-    mean += val
-mean = mean/(len(values))
-
-# Calculate the mode of the values
-for val in values:
-    # If the value is not in the dictionary, add it with a count of 1
-    if val not in d.keys():
-        d[val]=1
-    # If the value is already in the dictionary, increment its count by 1
+# File and column to analyse
+file_path = 'Data/Central_Tendencies.csv'
+column = 'Values'
+# Engine used to compute the central tendencies:
+#   'list' - load every value into a list and sort it (steps above)
+#   'stream' - read the CSV in chunks, memory stays flat for any file size
+#   'parallel' - summarise the shards on a process pool and merge the summaries
+#   'numpy' - keep the values in a NumPy array and use selection instead of sorting
+#   'benchmark' - time the list and NumPy engines on random data
+engine = 'list'
+# Shard files read by the parallel engine, e.g. glob.glob('Data/metrics-*.csv');
+# a single file is split into chunks instead
+shards = [file_path]
+# Number of worker processes used by the parallel engine (None = all cores)
+workers = None
+# Number of rows read per chunk by the stream and parallel engines
+chunksize = 100000
+# Median in the stream engine: 'exact' (external selection) or 'approx' (quantile sketch)
+median_method = 'exact'
+# Largest number of values (or distinct values in the mode table) kept in memory at once
+memory_budget = 1000000
+# Rank error of the quantile sketch used by the approximate median (0.01 = 1% of the count)
+sketch_error = 0.01
+# Number of values generated for each benchmark run
+benchmark_sizes = [10**6, 10**7, 10**8]
+# The list engine is skipped above this size (a Python list of 10^8 values needs several GB)
+benchmark_list_limit = 10**7
+
+
+# Compute mean, median and mode(s) of a list of values by sorting it
+def list_central_tendencies(values):
+    # Initialize variables to store mean, median, and mode
+    mean,median,mode=0,0,0
+    # Initialize an empty dictionary to store the frequency of each value for mode calculation
+    d={}
+
+    # Sort the values in ascending order to facilitate median and mode calculation
+    values = sorted(values)
+
+    # Calculate the median of the sorted values
+    if len(values) % 2 == 0:
+        # If the number of values is even, the median is the average of the two middle values
+        median = (values[len(values)//2-1]+values[len(values)//2])/2
+    else:
+        # If the number of values is odd, the median is the middle value
+        median = values[len(values)//2]
+
+    # Calculate the mean of the values
+    for val in values:
+        mean += val
+    mean = mean/(len(values))
+
+    # Calculate the mode of the values
+    for val in values:
+        # If the value is not in the dictionary, add it with a count of 1
+        if val not in d.keys():
+            d[val]=1
+        # If the value is already in the dictionary, increment its count by 1
+        else:
+            d[val]+=1
+
+    # Find the maximum frequency (count) from the dictionary
+    temp=0
+    for key,value in d.items():
+        if value>temp:
+            temp=value
+            # Store the value (key) with the maximum frequency as the mode
+            mode=key
+
+    # Collect all values (keys) that have the maximum frequency (mode)
+    modes = [key for key,value in d.items() if value == temp]
+    return mean, median, modes
+
+
+# Mode(s) of an array in ascending order: np.bincount for integers in a narrow range, else np.unique
+def count_modes(values):
+    if np.issubdtype(values.dtype, np.integer) and len(values):
+        minimum = values.min()
+        span = int(values.max()) - int(minimum) + 1
+        if span <= 2 * len(values):
+            counts = np.bincount(values - minimum, minlength=span)
+            return (np.flatnonzero(counts == counts.max()) + minimum).tolist()
+    unique, counts = np.unique(values, return_counts=True)
+    return unique[counts == counts.max()].tolist()
+
+
+# Compute mean, median and mode(s) of an array with selection instead of sorting
+def numpy_central_tendencies(values):
+    values = np.asarray(values)
+    n = len(values)
+    # Select both middle ranks (or the single one) in one np.partition call
+    ranks = [n//2 - 1, n//2] if n % 2 == 0 else [n//2]
+    middle = np.partition(values, ranks)[ranks]
+    median = middle.mean() if n % 2 == 0 else middle[0]
+    return values.mean().item(), median.item(), count_modes(values)
+
+
+# Time each engine on random integer data of every size and print the speedup over the first one.
+# engines maps a name to (function, 'list' or 'array'); list engines are skipped above list_limit.
+def benchmark(engines, sizes, list_limit, seed=0):
+    rng = np.random.default_rng(seed)
+    for n in sizes:
+        values = rng.integers(0, 1000, size=n)
+        print(f"n = {n:,}")
+        baseline = None
+        for i, (name, (function, kind)) in enumerate(engines.items()):
+            if kind == 'list' and n > list_limit:
+                print(f"\t{name:>8}: skipped (above list limit)")
+                continue
+            data = values.tolist() if kind == 'list' else values
+            start = time.perf_counter()
+            function(data)
+            elapsed = time.perf_counter() - start
+            del data
+            if i == 0:
+                baseline = elapsed
+            speedup = f" ({baseline / elapsed:.1f}x)" if baseline else ""
+            print(f"\t{name:>8}: {elapsed:.3f} s{speedup}")
+
+
+# Yield the values of one column chunk by chunk, skipping empty cells
+def read_chunks(file_path, column, chunksize):
+    for chunk in pd.read_csv(file_path, usecols=[column], chunksize=chunksize):
+        values = chunk[column].dropna().to_numpy()
+        if len(values):
+            yield values
+
+
+# Add x to a Kahan sum, returning the new total and the running compensation
+def kahan_add(total, compensation, x):
+    y = x - compensation
+    t = total + y
+    compensation = (t - total) - y
+    return t, compensation
+
+
+# KLL quantile sketch: a stack of compactors where an item on level h stands for 2**h values.
+# When a level overflows it is sorted and every other item (random offset) moves up one level,
+# so memory stays O(k log(n/k)) while ranks stay within about rank_error * count.
+class KLLSketch:
+    def __init__(self, rank_error=0.01, seed=None):
+        # Smallest k whose normalised rank error 2.296 / k**0.9723 is within rank_error
+        self.k = max(8, int(np.ceil((2.296 / rank_error) ** (1 / 0.9723))))
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.rng = np.random.default_rng(seed)
+
+    # Normalised rank error guaranteed (with high probability) by this k
+    def rank_error(self):
+        return 2.296 / self.k ** 0.9723
+
+    # Capacity shrinks geometrically from the top level down to the bottom one
+    def capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(8, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, values):
+        self.levels[0] = np.concatenate([self.levels[0], np.asarray(values, dtype=float)])
+        self.count += len(values)
+        self.compress()
+
+    def compress(self):
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) > self.capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(self.levels[level])
+                # With an odd number of items the smallest one stays behind so no weight is lost
+                odd = len(items) % 2
+                promoted = items[odd:][self.rng.integers(2)::2]
+                self.levels[level] = items[:odd]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.compress()
+        return self
+
+    # Approximate value at a 0-based rank of the sorted data
+    def select(self, rank):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items_h), 2 ** h) for h, items_h in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        index = np.searchsorted(cumulative, rank, side='right')
+        return items[order][min(index, len(items) - 1)]
+
+
+# Find the value at a 0-based rank without holding the whole column in memory.
+# Each pass histograms the values inside [lo, hi) and narrows the range to the bin holding
+# the rank. Once the range holds at most memory_budget values (or cannot be split any
+# further) a last pass counts its distinct values and the rank is read off directly.
+def external_select(file_path, column, chunksize, rank, lo, hi, inside, memory_budget, bins=4096):
+    while inside > memory_budget:
+        edges = np.linspace(lo, hi, bins + 1)
+        below = 0
+        hist = np.zeros(bins, dtype=np.int64)
+        for values in read_chunks(file_path, column, chunksize):
+            below += np.count_nonzero(values < lo)
+            selected = values[(values >= lo) & (values < hi)]
+            hist += np.bincount(np.searchsorted(edges, selected, side='right') - 1, minlength=bins)[:bins]
+        # Bin holding the rank, counted from the start of the range
+        b = np.searchsorted(np.cumsum(hist), rank - below, side='right')
+        if (edges[b], edges[b + 1]) == (lo, hi):
+            break
+        lo, hi, inside = edges[b], edges[b + 1], hist[b]
+
+    below = 0
+    counts = Counter()
+    for values in read_chunks(file_path, column, chunksize):
+        below += np.count_nonzero(values < lo)
+        unique, unique_counts = np.unique(values[(values >= lo) & (values < hi)], return_counts=True)
+        counts.update(dict(zip(unique.tolist(), unique_counts.tolist())))
+    keys = sorted(counts)
+    cumulative = np.cumsum([counts[key] for key in keys])
+    return keys[np.searchsorted(cumulative, rank - below, side='right')]
+
+
+# Mergeable summary of a set of values: count, Kahan sum, mean and M2 (sum of squared deviations
+# from the mean), min/max, a frequency table and a KLL sketch. Summaries built on separate chunks,
+# shards or processes combine with merge() in any grouping and describe all of their values.
+# The frequency table is dropped once it holds more than max_distinct values; quantiles then
+# come from the sketch and the mode is no longer available.
+class Summary:
+    def __init__(self, sketch_error=0.01, max_distinct=None, seed=None):
+        self.count = 0
+        self.total, self.compensation = 0.0, 0.0
+        self.average, self.m2 = 0.0, 0.0
+        self.minimum, self.maximum = np.inf, -np.inf
+        self.counts = Counter()
+        self.max_distinct = max_distinct
+        self.sketch = KLLSketch(sketch_error, seed) if sketch_error else None
+
+    def update(self, values):
+        values = np.asarray(values)
+        if len(values) == 0:
+            return self
+        # Summarise the chunk on its own, then merge it in
+        chunk = Summary(None, self.max_distinct)
+        chunk.count = len(values)
+        # math.fsum gives the exactly rounded sum of the chunk
+        chunk.total = math.fsum(values)
+        chunk.average = chunk.total / chunk.count
+        chunk.m2 = float(np.sum((values - chunk.average) ** 2))
+        chunk.minimum, chunk.maximum = values.min(), values.max()
+        if self.counts is not None:
+            unique, unique_counts = np.unique(values, return_counts=True)
+            chunk.counts = Counter(dict(zip(unique.tolist(), unique_counts.tolist())))
+        if self.sketch is not None:
+            self.sketch.update(values)
+        return self.merge(chunk)
+
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        n = self.count + other.count
+        # Pairwise (Chan et al.) update of the mean and M2
+        delta = other.average - self.average
+        self.average += delta * other.count / n
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / n
+        self.total, self.compensation = kahan_add(self.total, self.compensation, other.total - other.compensation)
+        self.count = n
+        self.minimum, self.maximum = min(self.minimum, other.minimum), max(self.maximum, other.maximum)
+        if self.counts is not None and other.counts is not None:
+            self.counts.update(other.counts)
+            if self.max_distinct is not None and len(self.counts) > self.max_distinct:
+                self.counts = None
+        else:
+            self.counts = None
+        if self.sketch is not None and other.sketch is not None:
+            self.sketch.merge(other.sketch)
+        return self
+
+    def mean(self):
+        return (self.total - self.compensation) / self.count
+
+    def variance(self):
+        return self.m2 / (self.count - 1)
+
+    def std(self):
+        return self.variance() ** 0.5
+
+    # Values at 0-based ranks of the sorted data: exact from the frequency table, else from the sketch
+    def select(self, ranks):
+        if self.counts is None:
+            return [self.sketch.select(rank) for rank in ranks]
+        keys = sorted(self.counts)
+        cumulative = np.cumsum([self.counts[key] for key in keys])
+        return [keys[np.searchsorted(cumulative, rank, side='right')] for rank in ranks]
+
+    def median(self):
+        if self.count % 2 == 0:
+            return sum(self.select([self.count // 2 - 1, self.count // 2])) / 2
+        return self.select([self.count // 2])[0]
+
+    # Mode(s) in ascending order, or None once the frequency table has been dropped
+    def modes(self):
+        if self.counts is None:
+            return None
+        temp = max(self.counts.values())
+        return sorted(key for key, value in self.counts.items() if value == temp)
+
+
+# Summarise an array of values (runs in a worker process).
+# Values outside bounds=(lo, hi) are left out of the summary and returned as outliers.
+def summarize_values(values, sketch_error=0.01, max_distinct=None, bounds=None):
+    outliers = values[:0]
+    if bounds is not None:
+        keep = (values >= bounds[0]) & (values <= bounds[1])
+        values, outliers = values[keep], values[~keep]
+    return Summary(sketch_error, max_distinct).update(values), outliers
+
+
+# Summarise one shard file chunk by chunk (runs in a worker process)
+def summarize_file(file_path, column, chunksize, sketch_error=0.01, max_distinct=None, bounds=None):
+    summary, outliers = Summary(sketch_error, max_distinct), []
+    for values in read_chunks(file_path, column, chunksize):
+        part, part_outliers = summarize_values(values, sketch_error, max_distinct, bounds)
+        summary.merge(part)
+        outliers.append(part_outliers)
+    return summary, np.concatenate(outliers) if outliers else np.empty(0)
+
+
+# Build a summary per shard (or per chunk of a single shard) on a process pool and merge them.
+# Returns the merged summary and the sorted values that fell outside bounds.
+def parallel_summary(shards, column, chunksize, sketch_error=0.01, max_distinct=None, bounds=None, workers=None):
+    summary, outliers = Summary(sketch_error, max_distinct), []
+    with Pool(workers) as pool:
+        if len(shards) == 1:
+            summarize = partial(summarize_values, sketch_error=sketch_error, max_distinct=max_distinct,
+                                bounds=bounds)
+            parts = pool.imap_unordered(summarize, read_chunks(shards[0], column, chunksize))
+        else:
+            summarize = partial(summarize_file, column=column, chunksize=chunksize, sketch_error=sketch_error,
+                                max_distinct=max_distinct, bounds=bounds)
+            parts = pool.imap_unordered(summarize, shards)
+        for part, part_outliers in parts:
+            summary.merge(part)
+            outliers.append(part_outliers)
+    return summary, np.sort(np.concatenate(outliers)).tolist() if outliers else []
+
+
+# Compute mean, median and mode(s) of a column by reading the CSV chunk by chunk
+def stream_central_tendencies(file_path, column, chunksize, median_method, memory_budget, sketch_error):
+    summary = Summary(sketch_error if median_method == 'approx' else None, memory_budget)
+    for values in read_chunks(file_path, column, chunksize):
+        summary.update(values)
+
+    # The median is the middle rank, or the average of the two middle ranks
+    count = summary.count
+    ranks = [count // 2 - 1, count // 2] if count % 2 == 0 else [count // 2]
+    if median_method == 'approx':
+        middle = [summary.sketch.select(rank) for rank in ranks]
+    elif summary.counts is not None:
+        # Few distinct values: read the median straight from the frequency table
+        middle = summary.select(ranks)
+    else:
+        hi = np.nextafter(float(summary.maximum), np.inf)
+        middle = [external_select(file_path, column, chunksize, rank, float(summary.minimum), hi, count,
+                                  memory_budget) for rank in ranks]
+    median = sum(middle) / 2 if len(middle) == 2 else middle[0]
+    return summary.mean(), median, summary.modes(), summary.sketch
+
+
+if __name__ == '__main__':
+    if engine == 'benchmark':
+        benchmark({'list': (list_central_tendencies, 'list'), 'numpy': (numpy_central_tendencies, 'array')},
+                  benchmark_sizes, benchmark_list_limit)
+        raise SystemExit
+
+    sketch = None
+    if engine == 'stream':
+        mean, median, modes, sketch = stream_central_tendencies(
+            file_path, column, chunksize, median_method, memory_budget, sketch_error)
+    elif engine == 'parallel':
+        summary, _ = parallel_summary(shards, column, chunksize, sketch_error, memory_budget, workers=workers)
+        mean, median, modes = summary.mean(), summary.median(), summary.modes()
+        # Without the frequency table the median comes from the sketch
+        if summary.counts is None:
+            sketch = summary.sketch
+    elif engine == 'numpy':
+        values = pd.read_csv(file_path)[column].to_numpy()
+        mean, median, modes = numpy_central_tendencies(values)
+    else:
+        # Read data from the CSV file named 'Central_Tendencies.csv' located in the 'Data' folder
+        data = pd.read_csv(file_path)
+
+        # Extract the values from the 'Values' column of the DataFrame and store them in a list called 'values'
+        values = data[column].tolist()
+
+        # Print the unsorted list of values
+        print(values)
+
+        mean, median, modes = list_central_tendencies(values)
+
+    # Print the calculated central tendencies (mean, median, and mode)
+    print("Central Tendencies: ")
+    print(f"Mean: {mean}")
+    if sketch is not None:
+        print(f"Median: {median} (approximate, rank error within {sketch.rank_error():.2%})")
+    else:
+        print(f"Median: {median}")
+    print("Mode:" , end=" " )
+    # Print all values that have the maximum frequency (mode)
+    if modes is None:
+        print("not available (too many distinct values)")
     else:
-        d[val]+=1
-
-# Find the maximum frequency (count) from the dictionary
-temp=0
-for key,value in d.items():
-    if value>temp:
-        temp=value
-        # Store the value (key) with the maximum frequency as the mode
-        mode=key
-
-# Print the calculated central tendencies (mean, median, and mode)
-print("Central Tendencies: ")
-print(f"Mean: {mean}")
-print(f"Median: {median}")
-print("Mode:" , end=" " )
-# Iterate through the dictionary and print all values (keys) that have the maximum frequency (mode)
-for key,value in d.items():
-    if value == temp:
-        print(key, end=", ")
-print()
+        for key in modes:
+            print(key, end=", ")
+        print()
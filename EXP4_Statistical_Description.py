@@ -46,126 +46,694 @@ Take the square root of the variance.
 11. Display Results:
 
 Show the calculated quartiles, mean, median, mode, variance, and standard deviation.
+Parallel Engine (engine = 'parallel'):
+
+Build one mergeable summary (count, sum, M2, frequency table, quantile sketch) per shard file, or per chunk
+of a single file, on a process pool and merge them (see EXP3).
+Read the quartiles, IQR and bounds from the merged summary.
+Summarise the shards a second time, leaving the values outside the bounds out as outliers.
+Read the mean, median, mode, variance and standard deviation from the second merged summary.
+
+NumPy Engine (engine = 'numpy'):
+
+Keep the columns in a NumPy array (one column per attribute) instead of a list and never sort it.
+Quartiles: select the ranks 0, n/4, n/2, 3n/4 and n-1 of every column with one np.partition call (linear-time
+selection), giving separate bounds l0 and h0 for each column.
+Outliers: compare the whole array with the bounds once to get a boolean keep-mask, and report the row indices
+and values outside it.
+Mean, variance and standard deviation: reduce over the array with where=keep, so the kept values are never copied.
+Median: the kept values of a column are the sorted ranks just past its low outliers, so the median is selected
+from the already partitioned column at those ranks.
+Mode: count the distinct values of each column and keep only the counts of values inside the bounds.
+Benchmark (engine = 'benchmark'): time the list and NumPy engines on random data of each size in benchmark_sizes.
+
+Sketch Engine (engine = 'sketch'):
+
+First pass: read the file in chunks into a summary whose quartiles come from a KLL quantile sketch with a
+chosen rank error (exact from a frequency table while there are at most max_distinct distinct values).
+Compute the IQR and the bounds h0 and l0 from the sketch quartiles.
+Second pass: read the file again, drop the values outside [l0, h0] (optionally writing the rest to
+filtered_path) and summarise the kept values for the mean, median, mode, variance and standard deviation.
+Memory stays bounded by the sketch, the frequency table cap and one chunk, so the file need not fit in RAM.
+The rank error of the sketch is reported next to the quartiles.
+
+Rolling Engine (engine = 'rolling'):
+
+Describe a stream over a sliding window: the last window_size samples and/or the samples of the last
+window_seconds seconds of time_column. When both are set both limits apply (set one to None to turn it off);
+window_seconds needs time_column.
+Keep the window's values in an indexable skip list (a sorted list with O(log W) insert, remove and
+access by rank), so the quartiles, median, IQR and bounds are read by rank after each sample.
+The skip list gains a level each time its size doubles, so a time-based window of any size stays O(log W).
+Missing samples (NaN, e.g. blank cells) are skipped: they have no place in the sorted order.
+Keep the mean and M2 with a rolling Welford update: add the new sample, remove the expired ones.
+Flag the newest sample as an outlier when it falls outside [l0, h0] of its window.
+Each sample costs O(log W) instead of redescribing the whole window.
+engine = 'rolling_benchmark' measures samples per second against redescribing the window with NumPy.
+
+Columns Engine (engine = 'columns'):
+
+Read a wide CSV and copy its numeric columns (or describe_columns) once into a shared memory block,
+one contiguous column after another.
+Split the columns into blocks and hand the blocks to a process pool; each worker attaches to the shared
+block by name, so only column numbers travel between processes, never the data.
+Each worker runs the mask-based NumPy description on its columns (empty cells left out).
+Collect one row per column (quartiles, IQR, bounds, outliers, mean, median, mode type, variance, standard
+deviation) into a tidy table, print it and write it to output_path as CSV or JSON.
 ---------------------------------------------------------------
 '''
 
+import json
+import math
+import random
+import time
+from collections import deque
+from functools import partial
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
 import pandas as pd
 
-# Initialize variables for mean, median, mode, mode count, and a dictionary for mode calculation
-mean,median,mode=0,0,0
-d={}
-out=[]
-modcount=0
-
-# Read data from the CSV file
-data = pd.read_csv('Data\Statistical Description.csv')
-# Extract the 'Values' column as a list
-values = data['Values'].tolist()
-# Sort the values in ascending order
-values.sort()
-# Print the sorted values
-print(values)
-
-# Calculate and print the quartiles of the data
-print("Quartiles: ")
-print("\tQ0: ",min(values)) # Minimum value (0th percentile)
-print("\tQ1: ",values[len(values)//4]) # First quartile (25th percentile)
-print("\tQ2: ",values[len(values)//2]) # Second quartile (median, 50th percentile)
-print("\tQ3: ",values[3*len(values)//4]) # Third quartile (75th percentile)
-print("\tQ4: ",max(values)) # Maximum value (100th percentile)
-print()
-
-# Calculate and print the interquartile range (IQR)
-iqr = values[3*len(values)//4]-values[len(values)//4]
-print(f"IQR: {iqr}")
-
-# Calculate and print the upper and lower bounds for outlier detection
-h0 = values[3*len(values)//4] + (1.5*iqr)
-l0 = values[len(values)//4] - (1.5*iqr)
-print(f"h0: {h0}")
-print(f"l0: {l0}")
-
-# Identify and print outliers below the lower bound
-p=0
-for i in range(0,len(values)//4):
-    if values[i]<l0:
-        p+=1
-        out.append(values[i])
-        print(values[i],end=", ")
-    else: 
-        if p==0:
-            print('None')
-        break
-
-# Identify and print outliers above the upper bound
-p=0
-for i in range(len(values)-1,3*len(values)//4,-1):
-    if values[i]>h0:
-        p+=1
-        out.append(values[i])
-        print(values[i],end=", ")
-    else: 
-        if p==0:
-            print('None')
-        break
-
-# Remove outliers from the values list
-while(out):
-    values.remove(out.pop())
-# Print the values list after removing outliers
-print(values)  
-
-# Calculate and print the mean of the data (excluding outliers)
-for val in values:
-    mean += val
-mean = mean/(len(values))
-print(f"Mean: {mean}")
-
-# Calculate and print the median of the data (excluding outliers)
-if len(values) % 2 == 0:
-    median = (values[len(values)//2]+values[len(values)//2+1])//2
-else:
-    median = values[len(values)//2]
-print(f"Median: {median}")
-
-# Calculate the mode of the data (excluding outliers)
-for val in values:
-    if val not in d.keys():
-        d[val]=1
+from EXP3_Central_Tendencies import Summary, benchmark, parallel_summary, read_chunks
+
+# File and column to analyse
+file_path = 'Data/Statistical Description.csv'
+column = 'Values'
+# Numeric columns described together by the numpy engine, each with its own bounds
+columns = [column]
+# Engine used to describe the data:
+#   'list' - sort the values in a list (steps above)
+#   'parallel' - summarise the shards on a process pool and merge the summaries
+#   'numpy' - keep the values in a NumPy array and use selection instead of sorting
+#   'benchmark' - time the list and NumPy engines on random data
+#   'sketch' - two streaming passes with quartiles from a quantile sketch, for files larger than memory
+#   'rolling' - describe a sliding window after every sample of the stream
+#   'rolling_benchmark' - samples per second of the rolling engine
+#   'columns' - describe every numeric column of a wide CSV on a process pool
+engine = 'list'
+# Shard files read by the parallel engine, e.g. glob.glob('Data/metrics-*.csv');
+# a single file is split into chunks instead
+shards = [file_path]
+# Number of worker processes used by the parallel and columns engines (None = all cores)
+workers = None
+# Number of rows read per chunk by the parallel and sketch engines
+chunksize = 100000
+# Rank error of the quantile sketch used once a frequency table grows too large
+sketch_error = 0.01
+# Largest frequency table the parallel and sketch engines keep before relying on the sketch (None = no limit)
+max_distinct = 100000
+# Sketch engine: file the values within the bounds are written to (None = not written)
+filtered_path = None
+# Sketch engine: largest number of outliers kept for printing
+outlier_limit = 100
+# Number of values generated for each benchmark run
+benchmark_sizes = [10**6, 10**7, 10**8]
+# The list engine is skipped above this size (a Python list of 10^8 values needs several GB)
+benchmark_list_limit = 10**7
+# Rolling engine: window of at most the last window_size samples and of the last window_seconds seconds
+# (None = no limit of that kind; both limits apply when both are set, and window_seconds needs time_column)
+window_size = 5
+window_seconds = None
+# Rolling engine: column with the time of each sample in seconds or as dates (None = no time column)
+time_column = None
+# Rolling benchmark: window sizes tried and number of samples streamed through each
+benchmark_windows = [100, 10000, 100000]
+benchmark_samples = 200000
+# Columns engine: columns to describe (None = every numeric column)
+describe_columns = None
+# Columns engine: number of columns handed to a worker at a time
+columns_per_task = 8
+# Columns engine: file the table is written to, .json for JSON records, anything else for CSV (None = not written)
+output_path = None
+
+
+# Node of the skip list: a value with its forward links and link widths (number of values skipped)
+class Node:
+    __slots__ = 'value', 'next', 'width'
+
+    def __init__(self, value, next, width):
+        self.value, self.next, self.width = value, next, width
+
+
+# Sentinel value that compares greater than any value in the skip list
+class End:
+    def __lt__(self, other):
+        return False
+
+    def __le__(self, other):
+        return False
+
+
+# Indexable skip list (after R. Hettinger's running-median recipe): a sorted multiset whose
+# insert, remove and access by rank all take O(log n) expected time. A level is added whenever
+# the size reaches 2**maxlevels, so expected_size is only a starting point.
+class IndexableSkiplist:
+    def __init__(self, expected_size=100):
+        self.size = 0
+        self.maxlevels = int(1 + math.log2(max(expected_size, 2)))
+        self.nil = Node(End(), [], [])
+        self.head = Node('HEAD', [self.nil]*self.maxlevels, [1]*self.maxlevels)
+
+    def __len__(self):
+        return self.size
+
+    # Value at a 0-based rank
+    def __getitem__(self, i):
+        node = self.head
+        i += 1
+        for level in reversed(range(self.maxlevels)):
+            while node.width[level] <= i:
+                i -= node.width[level]
+                node = node.next[level]
+        return node.value
+
+    def insert(self, value):
+        if self.size >= 2**self.maxlevels:
+            # New top level: the head links straight to the end, past every value
+            self.head.next.append(self.nil)
+            self.head.width.append(self.size + 1)
+            self.maxlevels += 1
+        # Find the last node before value on each level, and the steps taken on each level
+        chain = [None]*self.maxlevels
+        steps_at_level = [0]*self.maxlevels
+        node = self.head
+        for level in reversed(range(self.maxlevels)):
+            while node.next[level].value <= value:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        # Link the new node into a random number of levels (each one with probability 1/2)
+        d = min(self.maxlevels, 1 - int(math.log2(1.0 - random.random())))
+        new = Node(value, [None]*d, [None]*d)
+        steps = 0
+        for level in range(d):
+            prev = chain[level]
+            new.next[level] = prev.next[level]
+            prev.next[level] = new
+            new.width[level] = prev.width[level] - steps
+            prev.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(d, self.maxlevels):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, value):
+        # Find the last node before value on each level
+        chain = [None]*self.maxlevels
+        node = self.head
+        for level in reversed(range(self.maxlevels)):
+            while node.next[level].value < value:
+                node = node.next[level]
+            chain[level] = node
+        if value != chain[0].next[0].value:
+            raise KeyError(f'{value} not in skip list')
+
+        # Unlink the node on every level it appears on
+        d = len(chain[0].next[0].next)
+        for level in range(d):
+            prev = chain[level]
+            prev.width[level] += prev.next[level].width[level] - 1
+            prev.next[level] = prev.next[level].next[level]
+        for level in range(d, self.maxlevels):
+            chain[level].width[level] -= 1
+        self.size -= 1
+
+
+# Sliding-window description of a stream: at most the last `size` samples and the samples of the
+# last `seconds` seconds (either limit can be None; both apply when both are set). The mean and M2 follow a rolling Welford update and the order statistics
+# come from an indexable skip list, so each sample costs O(log W).
+class RollingDescription:
+    def __init__(self, size=None, seconds=None):
+        self.size, self.seconds = size, seconds
+        self.window = deque()
+        self.sorted = IndexableSkiplist(size or 1024)
+        self.mean, self.m2 = 0.0, 0.0
+
+    # Add one sample (with its time for a time-based window) and return the new description
+    # (None while the window is empty). A missing sample (NaN) is skipped, but its time still
+    # expires the old samples.
+    def add(self, value, timestamp=None):
+        if self.seconds is not None and timestamp is None:
+            raise ValueError("A time-based window needs the time of every sample")
+        missing = math.isnan(value)
+        if not missing:
+            self.window.append((timestamp, value))
+            self.sorted.insert(value)
+            # Welford step adding the sample
+            n = len(self.window)
+            delta = value - self.mean
+            self.mean += delta / n
+            self.m2 += delta * (value - self.mean)
+
+        # Expire the samples that fell out of the window
+        while ((self.size is not None and len(self.window) > self.size) or
+               (self.seconds is not None and self.window and timestamp - self.window[0][0] >= self.seconds)):
+            _, old = self.window.popleft()
+            self.sorted.remove(old)
+            # Welford step removing the sample
+            n = len(self.window)
+            if n == 0:
+                self.mean, self.m2 = 0.0, 0.0
+            else:
+                delta = old - self.mean
+                self.mean -= delta / n
+                self.m2 = max(self.m2 - delta * (old - self.mean), 0.0)
+        if not self.window:
+            return None
+        return self.describe(None if missing else value)
+
+    # Description of the current window, flagging `latest` if it lies outside the bounds
+    def describe(self, latest=None):
+        n = len(self.window)
+        q1, q2, q3 = self.sorted[n//4], self.sorted[n//2], self.sorted[3*n//4]
+        iqr = q3 - q1
+        h0 = q3 + (1.5*iqr)
+        l0 = q1 - (1.5*iqr)
+        median = (self.sorted[n//2-1] + q2)/2 if n % 2 == 0 else q2
+        var = self.m2/(n-1) if n > 1 else 0.0
+        return {'count': n, 'mean': self.mean, 'var': var, 'sd': var**0.5, 'median': median,
+                'q1': q1, 'q2': q2, 'q3': q3, 'iqr': iqr, 'h0': h0, 'l0': l0,
+                'outlier': latest is not None and (latest < l0 or latest > h0)}
+
+
+# Stream the samples of a file through a rolling window and print the description after each one
+def rolling_description(file_path, column, time_column, window_size, window_seconds):
+    if window_seconds is not None and time_column is None:
+        raise ValueError("window_seconds needs a time_column with the time of each sample")
+    data = pd.read_csv(file_path, usecols=[column] + ([time_column] if time_column else []))
+    times = [None]*len(data)
+    if time_column is not None:
+        times = data[time_column]
+        if not pd.api.types.is_numeric_dtype(times):
+            # Dates are turned into seconds
+            times = (pd.to_datetime(times) - pd.Timestamp(0)).dt.total_seconds()
+        times = times.tolist()
+
+    rolling = RollingDescription(window_size, window_seconds)
+    print("value\tcount\tmean\tsd\tmedian\tQ1\tQ3\tl0\th0\toutlier")
+    for value, timestamp in zip(data[column].tolist(), times):
+        d = rolling.add(value, timestamp)
+        if d is None:
+            print(f"{value}\t0")
+            continue
+        print(f"{value}\t{d['count']}\t{d['mean']:.4g}\t{d['sd']:.4g}\t{d['median']}\t{d['q1']}\t{d['q3']}"
+              f"\t{d['l0']}\t{d['h0']}\t{'yes' if d['outlier'] else ''}")
+
+
+# Samples per second of the rolling engine against redescribing each window with NumPy.
+# Both are timed on a full window, after it has been filled with w samples.
+def rolling_benchmark(windows, samples, seed=0):
+    rng = np.random.default_rng(seed)
+    for w in windows:
+        stream = rng.normal(size=w + samples)
+        values = stream.tolist()
+        rolling = RollingDescription(w)
+        for value in values[:w]:
+            rolling.add(value)
+        start = time.perf_counter()
+        for value in values[w:]:
+            rolling.add(value)
+        rate = samples/(time.perf_counter() - start)
+
+        # Redescribing from scratch is timed on fewer samples, it would take too long otherwise
+        ticks = min(samples, 1000)
+        start = time.perf_counter()
+        for i in range(w, w + ticks):
+            window = stream[i - w + 1:i + 1]
+            np.partition(window, [w//4, w//2, 3*w//4])
+            window.mean(), window.var()
+        naive = ticks/(time.perf_counter() - start)
+        print(f"window {w:>9,}: rolling {rate:>10,.0f} samples/s, numpy redescribe {naive:>10,.0f} samples/s")
+
+
+# Name the type of mode from the number of modes
+def mode_type(modcount):
+    if modcount==0:
+        return "No mode"
+    elif(modcount==1):
+        return "Unimode"
+    elif(modcount==2):
+        return "Bimode"
+    else:
+        return "Multimode"
+
+
+# Describe a list of values by sorting it, returning the statistics in a dictionary
+def list_description(values):
+    # Initialize variables for mean, median, mode, mode count, and a dictionary for mode calculation
+    mean,median,mode=0,0,0
+    d={}
+    out=[]
+    modcount=0
+
+    # Sort the values in ascending order
+    values = sorted(values)
+
+    # Calculate the quartiles of the data
+    quartiles = (min(values), # Minimum value (0th percentile)
+                 values[len(values)//4], # First quartile (25th percentile)
+                 values[len(values)//2], # Second quartile (median, 50th percentile)
+                 values[3*len(values)//4], # Third quartile (75th percentile)
+                 max(values)) # Maximum value (100th percentile)
+
+    # Calculate the interquartile range (IQR)
+    iqr = values[3*len(values)//4]-values[len(values)//4]
+
+    # Calculate the upper and lower bounds for outlier detection
+    h0 = values[3*len(values)//4] + (1.5*iqr)
+    l0 = values[len(values)//4] - (1.5*iqr)
+
+    # Identify outliers below the lower bound
+    for i in range(0,len(values)//4):
+        if values[i]<l0:
+            out.append(values[i])
+        else:
+            break
+
+    # Identify outliers above the upper bound
+    for i in range(len(values)-1,3*len(values)//4,-1):
+        if values[i]>h0:
+            out.append(values[i])
+        else:
+            break
+    outliers = list(out)
+
+    # Remove outliers from the values list
+    while(out):
+        values.remove(out.pop())
+
+    # Calculate the mean of the data (excluding outliers)
+    for val in values:
+        mean += val
+    mean = mean/(len(values))
+
+    # Calculate the median of the data (excluding outliers)
+    if len(values) % 2 == 0:
+        median = (values[len(values)//2-1]+values[len(values)//2])/2
+    else:
+        median = values[len(values)//2]
+
+    # Calculate the mode of the data (excluding outliers)
+    for val in values:
+        if val not in d.keys():
+            d[val]=1
+        else:
+            d[val]+=1
+    temp=0
+    for key,value in d.items():
+        if value>temp:
+            temp=value
+            mode=key
+    modes = [key for key,value in d.items() if value == temp]
+    modcount = len(modes)
+
+    # Calculate the variance and standard deviation of the data (excluding outliers)
+    sqsum=0
+    for num in values:
+        sqsum += (num-mean)**2
+    var = sqsum/(len(values)-1)
+    sd = var**0.5
+
+    return {'quartiles': quartiles, 'iqr': iqr, 'h0': h0, 'l0': l0, 'outliers': outliers, 'values': values,
+            'mean': mean, 'median': median, 'modes': modes, 'mode_type': mode_type(modcount),
+            'var': var, 'sd': sd}
+
+
+# Describe every column of a 2-D array (rows x columns) at once with one boolean keep-mask.
+# Each column gets its own bounds; the statistics of the kept values are read through the mask
+# instead of from a filtered copy.
+def mask_description(table):
+    table = np.asarray(table)
+    n = len(table)
+    # Select the minimum, the three quartile ranks and the maximum of every column in one np.partition call.
+    # This is the only copy of the data; the medians below are selected from it in place.
+    ranks = [0, n//4, n//2, 3*n//4, n-1]
+    part = np.partition(table, ranks, axis=0)
+    quartiles = part[ranks]
+    q1, q3 = quartiles[1], quartiles[3]
+    iqr = q3 - q1
+    h0 = q3 + (1.5*iqr)
+    l0 = q1 - (1.5*iqr)
+
+    # One keep-mask for all columns, with the bounds broadcast across the rows
+    keep = (table >= l0) & (table <= h0)
+    kept = np.count_nonzero(keep, axis=0)
+    low = np.count_nonzero(table < l0, axis=0)
+    mean = np.mean(table, axis=0, where=keep)
+    var = np.var(table, axis=0, where=keep, ddof=1)
+
+    results = []
+    for j in range(table.shape[1]):
+        # The kept values of column j are the sorted ranks low[j] .. low[j] + kept[j] - 1
+        m = kept[j]
+        middle = [low[j] + m//2 - 1, low[j] + m//2] if m % 2 == 0 else [low[j] + m//2]
+        col = part[:, j]
+        col.partition(middle)
+        median = col[middle].mean() if m % 2 == 0 else col[middle[0]]
+
+        # Count the distinct values, then keep only the counts inside the bounds
+        unique, counts = np.unique(col, return_counts=True)
+        inside = (unique >= l0[j]) & (unique <= h0[j])
+        unique, counts = unique[inside], counts[inside]
+        modes = unique[counts == counts.max()].tolist()
+
+        # Low outliers are listed ascending and high ones descending, like the list engine
+        rows = np.flatnonzero(~keep[:, j])
+        values = table[rows, j]
+        order = np.lexsort((np.where(values < l0[j], values, -values), values > h0[j]))
+        results.append({'quartiles': tuple(quartiles[:, j].tolist()), 'iqr': iqr[j].item(),
+                        'h0': h0[j].item(), 'l0': l0[j].item(),
+                        'outliers': values[order].tolist(), 'outlier_rows': rows.tolist(),
+                        'mean': mean[j].item(), 'median': median.item(), 'modes': modes,
+                        'mode_type': mode_type(len(modes)), 'var': var[j].item(), 'sd': var[j].item()**0.5})
+    return results
+
+
+# Describe a single array of values with the mask-based engine
+def numpy_description(values):
+    return mask_description(np.asarray(values)[:, None])[0]
+
+
+# Describe some columns of a table as tidy records, one per column.
+# Empty cells (NaN) are left out of each column; outlier rows refer to rows of the table.
+def describe_block(table, names, block):
+    records = []
+    for j in block:
+        col = table[:, j]
+        rows = np.flatnonzero(~np.isnan(col))
+        if len(rows) == 0:
+            # An empty column has nothing to describe: count 0 and NaN statistics
+            records.append({'column': names[j], 'count': 0, **{f'Q{i}': np.nan for i in range(5)},
+                            'IQR': np.nan, 'l0': np.nan, 'h0': np.nan, 'outlier_count': 0, 'outliers': [],
+                            'outlier_rows': [], 'mean': np.nan, 'median': np.nan, 'modes': [],
+                            'mode_type': mode_type(0), 'variance': np.nan, 'sd': np.nan})
+            continue
+        result = mask_description(col[:, None] if len(rows) == len(col) else col[rows][:, None])[0]
+        records.append({'column': names[j], 'count': len(rows),
+                        **{f'Q{i}': q for i, q in enumerate(result['quartiles'])},
+                        'IQR': result['iqr'], 'l0': result['l0'], 'h0': result['h0'],
+                        'outlier_count': len(result['outliers']), 'outliers': result['outliers'],
+                        'outlier_rows': rows[result['outlier_rows']].tolist(),
+                        'mean': result['mean'], 'median': result['median'], 'modes': result['modes'],
+                        'mode_type': result['mode_type'], 'variance': result['var'], 'sd': result['sd']})
+    return records
+
+
+# Describe a block of columns of the table held in shared memory (runs in a worker process)
+def describe_shared_columns(shm_name, shape, names, block):
+    shm = SharedMemory(name=shm_name)
+    try:
+        return describe_block(np.ndarray(shape, dtype=np.float64, buffer=shm.buf, order='F'), names, block)
+    finally:
+        shm.close()
+
+
+# Describe every column of a wide CSV on a process pool, sharing the columns through shared memory
+def parallel_columns_description(file_path, names, workers, columns_per_task):
+    data = pd.read_csv(file_path, usecols=names)
+    data = data.select_dtypes('number') if names is None else data[names]
+    names, shape = list(data.columns), data.shape
+
+    # Copy the columns once into a shared block in column-major order, so each column is contiguous
+    shm = SharedMemory(create=True, size=max(data.size, 1) * 8)
+    try:
+        table = np.ndarray(shape, dtype=np.float64, buffer=shm.buf, order='F')
+        for j, name in enumerate(names):
+            table[:, j] = data[name].to_numpy(dtype=np.float64, na_value=np.nan)
+        del data, table
+
+        # Workers receive only the block name and their column numbers
+        blocks = [range(i, min(i + columns_per_task, len(names))) for i in range(0, len(names), columns_per_task)]
+        with Pool(workers) as pool:
+            parts = pool.map(partial(describe_shared_columns, shm.name, shape, names), blocks)
+    finally:
+        shm.close()
+        shm.unlink()
+    return pd.DataFrame([record for part in parts for record in part])
+
+
+# Rank error of the quantiles read from a summary, or None when they are exact
+def quantile_error(summary):
+    return None if summary.counts is not None else summary.sketch.rank_error()
+
+
+# Describe the shards with two rounds of mergeable summaries on a process pool
+def parallel_description(shards, column, chunksize, sketch_error, max_distinct, workers):
+    # First round: quartiles and bounds of all values
+    summary, _ = parallel_summary(shards, column, chunksize, sketch_error, max_distinct, workers=workers)
+    n = summary.count
+    q1, q2, q3 = summary.select([n//4, n//2, 3*n//4])
+    iqr = q3 - q1
+    h0 = q3 + (1.5*iqr)
+    l0 = q1 - (1.5*iqr)
+
+    # Second round: everything else with the outliers left out
+    kept, outliers = parallel_summary(shards, column, chunksize, sketch_error, max_distinct, bounds=(l0, h0),
+                                      workers=workers)
+    modes = kept.modes()
+    return {'quartiles': (summary.minimum, q1, q2, q3, summary.maximum), 'iqr': iqr, 'h0': h0, 'l0': l0,
+            'outliers': outliers, 'mean': kept.mean(), 'median': kept.median(), 'modes': modes,
+            'mode_type': mode_type(len(modes)) if modes is not None else None,
+            'var': kept.variance(), 'sd': kept.std(),
+            'quartile_error': quantile_error(summary), 'median_error': quantile_error(kept)}
+
+
+# Describe a file too large for memory in two streaming passes, with quartiles from a quantile sketch
+def sketch_description(file_path, column, chunksize, sketch_error, max_distinct, filtered_path, outlier_limit):
+    # First pass: quartiles and bounds from the sketch
+    summary = Summary(sketch_error, max_distinct)
+    for values in read_chunks(file_path, column, chunksize):
+        summary.update(values)
+    n = summary.count
+    q1, q2, q3 = summary.select([n//4, n//2, 3*n//4])
+    iqr = q3 - q1
+    h0 = q3 + (1.5*iqr)
+    l0 = q1 - (1.5*iqr)
+
+    # Second pass: filter out the outliers and summarise the values that are left
+    kept, outliers, outlier_count = Summary(sketch_error, max_distinct), [], 0
+    for i, values in enumerate(read_chunks(file_path, column, chunksize)):
+        keep = (values >= l0) & (values <= h0)
+        kept.update(values[keep])
+        outlier_count += len(values) - np.count_nonzero(keep)
+        outliers.extend(values[~keep][:outlier_limit - len(outliers)].tolist())
+        if filtered_path is not None:
+            pd.DataFrame({column: values[keep]}).to_csv(filtered_path, mode='w' if i == 0 else 'a',
+                                                        header=i == 0, index=False)
+
+    modes = kept.modes()
+    return {'quartiles': (summary.minimum, q1, q2, q3, summary.maximum), 'iqr': iqr, 'h0': h0, 'l0': l0,
+            'outliers': sorted(outliers), 'outlier_count': outlier_count,
+            'mean': kept.mean(), 'median': kept.median(), 'modes': modes,
+            'mode_type': mode_type(len(modes)) if modes is not None else None,
+            'var': kept.variance(), 'sd': kept.std(),
+            'quartile_error': quantile_error(summary), 'median_error': quantile_error(kept)}
+
+
+# Print a description in the same layout for every engine
+def print_description(result):
+    # Print the quartiles of the data
+    print("Quartiles: ")
+    for i, q in enumerate(result['quartiles']):
+        print(f"\tQ{i}: ",q)
+    # Quartiles read from a sketch are within this fraction of the count of their true rank
+    if result.get('quartile_error') is not None:
+        print(f"\t(Q1-Q3 approximate: rank error within {result['quartile_error']:.2%} of the count)")
+    print()
+
+    # Print the interquartile range (IQR) and the bounds for outlier detection
+    print(f"IQR: {result['iqr']}")
+    print(f"h0: {result['h0']}")
+    print(f"l0: {result['l0']}")
+
+    # Print the outliers below the lower bound and above the upper bound
+    print("Outliers:", end=" ")
+    if result['outliers']:
+        for val in result['outliers']:
+            print(val, end=", ")
+        print()
+        # The numpy engine also reports the row of each outlier
+        if 'outlier_rows' in result:
+            print(f"Outlier rows: {result['outlier_rows']}")
+        # The sketch engine keeps only the first outlier_limit outliers
+        if result.get('outlier_count', 0) > len(result['outliers']):
+            print(f"({result['outlier_count']} outliers in total, {len(result['outliers'])} shown)")
+    else:
+        print('None')
+
+    # Print the values list after removing outliers
+    if 'values' in result:
+        print(result['values'])
+
+    print(f"Mean: {result['mean']}")
+    if result.get('median_error') is not None:
+        print(f"Median: {result['median']} (approximate: rank error within {result['median_error']:.2%})")
+    else:
+        print(f"Median: {result['median']}")
+
+    # Print the mode(s) of the data and the type of mode (unimodal, bimodal, multimodal, or no mode)
+    print("Mode:" , end=" " )
+    if result['modes'] is None:
+        print("not available (too many distinct values)")
+    else:
+        for key in result['modes']:
+            print(key, end=", ")
+        print()
+        print(result['mode_type'])
+    print()
+
+    # Print the variance and standard deviation of the data (excluding outliers)
+    print(f"Variance: {result['var']}")
+    print(f"Standard Deviation: {result['sd']}")
+
+
+if __name__ == '__main__':
+    if engine == 'benchmark':
+        benchmark({'list': (list_description, 'list'), 'numpy': (numpy_description, 'array')},
+                  benchmark_sizes, benchmark_list_limit)
+        raise SystemExit
+
+    if engine == 'columns':
+        table = parallel_columns_description(file_path, describe_columns, workers, columns_per_task)
+        print(table.drop(columns=['outliers', 'outlier_rows', 'modes']).to_string(index=False))
+        if output_path is not None and output_path.endswith('.json'):
+            with open(output_path, 'w') as f:
+                json.dump(table.to_dict(orient='records'), f, indent=2)
+        elif output_path is not None:
+            table.to_csv(output_path, index=False)
+        raise SystemExit
+
+    if engine == 'rolling':
+        rolling_description(file_path, column, time_column, window_size, window_seconds)
+        raise SystemExit
+    if engine == 'rolling_benchmark':
+        rolling_benchmark(benchmark_windows, benchmark_samples)
+        raise SystemExit
+
+    if engine == 'parallel':
+        result = parallel_description(shards, column, chunksize, sketch_error, max_distinct, workers)
+    elif engine == 'sketch':
+        result = sketch_description(file_path, column, chunksize, sketch_error, max_distinct, filtered_path,
+                                    outlier_limit)
+    elif engine == 'numpy':
+        table = pd.read_csv(file_path, usecols=columns)[columns].to_numpy()
+        results = mask_description(table)
+        for name, result in zip(columns[:-1], results[:-1]):
+            print(f"Column: {name}")
+            print_description(result)
+            print()
+        if len(columns) > 1:
+            print(f"Column: {columns[-1]}")
+        result = results[-1]
     else:
-        d[val]+=1
-temp=0
-for key,value in d.items():
-    if value>temp:
-        temp=value
-        mode=key
-
-# Print the mode(s) of the data
-print("Mode:" , end=" " )
-for key,value in d.items():
-    if value == temp:
-        modcount+=1
-        print(key, end=", ")
-print()
-
-# Determine and print the type of mode (unimodal, bimodal, multimodal, or no mode)
-if modcount==0:
-    print("No mode")
-elif(modcount==1):
-    print("Unimode")
-elif(modcount==2):
-    print("Bimode")
-else:
-    print("Multimode")
-
-print()
-
-# Calculate and print the variance and standard deviation of the data (excluding outliers)
-sqsum=0
-for num in values:
-    sqsum += (num-mean)**2
-var = sqsum/(len(values)-1)
-sd = var**0.5
-
-print(f"Variance: {var}")
-print(f"Standard Deviation: {sd}")
+        # Read data from the CSV file
+        data = pd.read_csv(file_path)
+        # Extract the 'Values' column as a list
+        values = data[column].tolist()
+        # Print the sorted values
+        print(sorted(values))
+        result = list_description(values)
+
+    print_description(result)
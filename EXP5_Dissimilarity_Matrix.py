@@ -39,49 +39,683 @@ Output
 Display all three dissimilarity matrices
 Format output without row/column labe
 
+Vector Engine (engine = 'vector'):
+
+Integer-code every nominal column once, so attributes are compared by code equality instead of as strings.
+Visit the upper triangle (i < j) in square tiles of block_rows x block_rows records.
+For each tile compute the numerical dissimilarity for all pairs at once (Manhattan, Euclidean or Minkowski
+distance with scipy's cdist) and the nominal one by adding up the code mismatches of each attribute.
+Compute the mixed dissimilarity once per pair as their average.
+Store only the condensed upper triangle (n(n-1)/2 values, same order as scipy's pdist) and expand it to the
+symmetric square matrix only for display (square = True).
+Benchmark (engine = 'benchmark'): time the loop method (on benchmark_loop_rows records, scaled up by the
+number of pairs) against the vector engine on random records of each size in benchmark_sizes.
+The three condensed matrices are kept while they fit in benchmark_memory bytes; above that (3 x 3.6 GB for 30k
+records) every tile is computed and discarded, so the default sizes run on an ordinary machine.
+
+Disk Engine (engine = 'disk'):
+
+A square float64 matrix of 200k records needs about 320 GB, so the matrices are written tile by tile straight
+into memory-mapped files in output_dir instead of being held in memory; only one tile (block_rows x block_rows)
+is in memory at a time, so block_rows sets the working set.
+Layout: each matrix (numerical.npy, nominal.npy, mixed.npy, only those listed in kinds) is a NumPy .npy file
+holding the condensed upper triangle as a 1-D array of n(n-1)/2 values in dtype (float64, float32 or float16).
+The pair (i, j) with i < j is at position n*i - i*(i+1)/2 + (j - i - 1), so the pairs of record i with the
+records after it are contiguous (scipy's pdist order). The diagonal is zero and (j, i) equals (i, j).
+layout.json records n, the dtype and the file of each matrix.
+DissimilarityReader opens a file with a memory map and reads single rows or tiles on demand, without
+loading the whole matrix.
+
+Parallel Engine (engine = 'parallel', or the disk engine with workers > 1):
+
+Cut the upper triangle into tiles of block_rows x block_rows records and hand them to a process pool,
+largest tiles first, so every worker keeps getting work until the triangle is done (the diagonal tiles hold
+half as many pairs as the others).
+Copy the records into shared memory once; each worker attaches to it when it starts, so no records are
+pickled per tile.
+Workers write their tiles straight into the output: shared memory blocks (parallel engine) or the memory-mapped
+files of the disk engine. The blocks are created empty (the system fills them with zeros) and the matrices are
+read from them in place, so each output is held in memory once. Each pair is computed exactly as in the serial
+engine, so the results are bit-identical.
+Print the progress as tiles complete.
+Scaling (engine = 'scaling'): time the parallel engine with each number of workers in benchmark_workers.
+
+Gower Engine (engine = 'gower'):
+
+The mixed matrix above adds raw differences, so an attribute with a wide range (salary) outweighs one with
+a narrow range (age), and it needs the numerical and nominal matrices before it can be computed.
+Gower's dissimilarity gives every attribute the same weight: for a numerical attribute f the contribution of
+a pair is |x_if - x_jf| / R_f, where R_f is the range (max - min) of f; for a nominal attribute it is 0 if the
+values are equal and 1 otherwise. The dissimilarity is the average contribution over the p attributes, so
+it lies between 0 and 1.
+The type of every column is given in schema (column name or position -> 'numeric' or 'nominal') instead of
+being guessed from the data.
+Divide every numerical column by its range and integer-code every nominal column once.
+For each record i, add the contributions of each attribute over the records j > i to one row buffer, divide
+by p and write it to the condensed upper triangle; no per-attribute matrix is ever built, so only the output
+is n x n (a third of the numerical, nominal and mixed matrices).
+
+Neighbour Index (engine = 'neighbours'):
+
+Most uses of the matrices only need the nearest records of each record, so build a KD-tree (scipy's cKDTree)
+over the records instead of computing all n^2 pairs, and answer batched k-nearest-neighbour and radius
+queries from it in about O(log n) per neighbour.
+numerical: the tree is built on the numerical attributes with the Manhattan (p = 1), Euclidean (p = 2) or
+Minkowski (p) distance.
+nominal, mixed and gower: two one-hot encoded values differ in 2 places if the values differ, so the mismatch
+count of a nominal attribute is half the Manhattan distance between the one-hot vectors. The tree is built on
+the Manhattan distance between the points [numerical, one-hot/2] scaled by 1/2 (mixed) or
+[numerical/range, one-hot/2] scaled by 1/p (gower), which give exactly the same dissimilarities.
+When that is not possible (the mixed dissimilarity with a Euclidean or Minkowski numerical part, or more than
+max_categories one-hot columns, where a tree no longer helps) the index falls back to a brute-force search in
+blocks of records, keeping only the nearest records of each block.
+A record is never its own neighbour.
+Neighbour benchmark (engine = 'neighbour_benchmark'): time building the index and finding the k nearest
+records of every record, against computing the full matrix and sorting each row (up to benchmark_matrix_rows
+records).
 --------------------------------------------------------------------------------- 
 '''
+import json
+import math
+import os
+import sys
+import time
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+
 import pandas as pd
 import numpy as np
+from scipy.spatial import cKDTree
+from scipy.spatial.distance import cdist, squareform
 
-# Read the input data
-df = pd.read_csv('Data\Dissimilarity_Matrix.csv')
+# File to read
+file_path = 'Data/Dissimilarity_Matrix.csv'
+# Engine used to compute the matrices:
+#   'loop' - compare every pair of records with a double loop (steps above)
+#   'vector' - array-level tiles stored as condensed upper triangles
+#   'benchmark' - time the loop method against the vector engine
+#   'disk' - like 'vector', but written tile by tile into memory-mapped files
+#   'parallel' - like 'vector', with the tiles computed on a process pool
+#   'scaling' - time the parallel engine with different numbers of workers
+#   'gower' - range-normalized Gower dissimilarity of the columns in schema
+#   'neighbours' - nearest records of every record from a neighbour index
+#   'neighbour_benchmark' - time the neighbour index against the full matrix
+engine = 'loop'
+# Columns treated as numerical (None = every numeric column)
+numeric_columns = None
+# Columns treated as nominal (None = every column, as the loop method compares every attribute)
+nominal_columns = None
+# Numerical distance of the vector engine: 'manhattan', 'euclidean' or 'minkowski'
+metric = 'manhattan'
+# Order of the Minkowski distance
+minkowski_p = 3
+# Number of records per side of a tile
+block_rows = 2048
+# Expand the condensed matrices to square ones when printing
+square = True
+# Data type the vector and disk engines store (float32 halves the size; float16 overflows above 65504)
+dtype = 'float64'
+# Disk engine: folder the matrices are written to, and the matrices written
+output_dir = 'Data/Dissimilarity_Matrix'
+kinds = ['numerical', 'nominal', 'mixed']
+# Gower engine: type of each column ('numeric' or 'nominal'), by column name or position
+schema = {0: 'numeric', 1: 'numeric'}
+# Neighbour index: dissimilarity used ('numerical', 'nominal', 'mixed' or 'gower'), number of neighbours
+# found for every record, radius of the radius query (None = no radius query), most one-hot columns put
+# in the tree
+neighbour_kind = 'numerical'
+neighbours = 5
+radius = None
+max_categories = 32
+# Neighbour benchmark: largest number of records for which the full matrix is computed
+benchmark_matrix_rows = 10000
+# Worker processes of the parallel engine and the disk engine (1 = compute the tiles in this process)
+workers = 4
+# Print the progress of the parallel engine
+progress = True
+# Scaling benchmark: numbers of workers tried, and number of random records
+benchmark_workers = [1, 2, 4, 8]
+scaling_rows = 10000
+# Number of records generated for each benchmark run
+benchmark_sizes = [1000, 10000, 30000]
+# The loop method is timed on this many records and scaled up by the number of pairs
+benchmark_loop_rows = 100
+# Largest size in bytes of the three condensed matrices stored by the benchmark; larger runs discard the tiles
+benchmark_memory = 2**31
 
-# Initialize matrix for numerical attributes (like age, salary)
-num_dissmat = np.zeros((len(df), len(df)))
 
-# Calculate numerical dissimilarity (Manhattan distance)
-for i in range(len(df)):
-    for j in range(len(df)):
-        # Sum of absolute differences between rows i and j
-        num_dissmat[i][j] = np.sum(np.abs(df.iloc[i] - df.iloc[j]))
+# Compute the three dissimilarity matrices with a double loop over the records
+def loop_dissimilarity(df):
+    # Initialize matrix for numerical attributes (like age, salary)
+    num_dissmat = np.zeros((len(df), len(df)))
 
-# Initialize matrix for nominal/categorical attributes
-nom_dissmat = np.zeros((len(df), len(df)))
+    # Calculate numerical dissimilarity (Manhattan distance)
+    for i in range(len(df)):
+        for j in range(len(df)):
+            # Sum of absolute differences between rows i and j
+            num_dissmat[i][j] = np.sum(np.abs(df.iloc[i] - df.iloc[j]))
 
-# Calculate nominal dissimilarity (count of unequal attributes)
-for i in range(len(df)):
-    for j in range(len(df)):
-        # Count number of mismatches between rows i and j
-        nom_dissmat[i][j] = np.sum(df.iloc[i] != df.iloc[j])
+    # Initialize matrix for nominal/categorical attributes
+    nom_dissmat = np.zeros((len(df), len(df)))
 
-# Initialize matrix for combined dissimilarity
-mix_dissmat = np.zeros((len(df), len(df)))
+    # Calculate nominal dissimilarity (count of unequal attributes)
+    for i in range(len(df)):
+        for j in range(len(df)):
+            # Count number of mismatches between rows i and j
+            nom_dissmat[i][j] = np.sum(df.iloc[i] != df.iloc[j])
 
-# Calculate mixed dissimilarity (average of numerical and nominal)
-for i in range(len(df)):
-    for j in range(len(df)):
-        if i >= j:
+    # Initialize matrix for combined dissimilarity
+    mix_dissmat = np.zeros((len(df), len(df)))
+
+    # Calculate mixed dissimilarity (average of numerical and nominal)
+    for i in range(len(df)):
+        for j in range(i + 1):
             # Average of numerical and nominal dissimilarities
             mix_dissmat[i][j] = (num_dissmat[i][j] + nom_dissmat[i][j])/2
+            # Matrix is symmetric, copy the lower triangle to the upper one
+            mix_dissmat[j][i] = mix_dissmat[i][j]
+
+    return num_dissmat, nom_dissmat, mix_dissmat
+
+
+# Split the records into a float array of numerical attributes and an integer array of nominal codes.
+# Each nominal column is factorized once, so equal values get equal codes.
+def encode(df, numeric_columns, nominal_columns):
+    if numeric_columns is None:
+        numeric_columns = list(df.select_dtypes('number').columns)
+    if nominal_columns is None:
+        nominal_columns = list(df.columns)
+    numeric = df[numeric_columns].to_numpy(dtype=np.float64)
+    codes = np.zeros((len(df), len(nominal_columns)), dtype=np.int64)
+    for f, name in enumerate(nominal_columns):
+        codes[:, f] = pd.factorize(df[name])[0]
+    return numeric, codes
+
+
+# Numerical, nominal and mixed dissimilarities between records i0..i1 and j0..j1 as three tiles.
+# The records j are taken from other_numeric and other_codes when given.
+def dissimilarity_tiles(numeric, codes, i0, i1, j0, j1, metric, p, other_numeric=None, other_codes=None):
+    if other_numeric is None:
+        other_numeric, other_codes = numeric, codes
+    if numeric.shape[1]:
+        name = {'manhattan': 'cityblock', 'euclidean': 'euclidean', 'minkowski': 'minkowski'}[metric]
+        num = cdist(numeric[i0:i1], other_numeric[j0:j1], name, **({'p': p} if metric == 'minkowski' else {}))
+    else:
+        num = np.zeros((i1 - i0, j1 - j0))
+    # Add up the mismatches of each nominal attribute
+    nom = np.zeros((i1 - i0, j1 - j0))
+    for f in range(codes.shape[1]):
+        nom += codes[i0:i1, f, None] != other_codes[None, j0:j1, f]
+    return num, nom, (num + nom)/2
+
+
+# Copy the pairs i < j of a tile starting at record (i0, j0) into a condensed upper triangle.
+# The pairs of record i with j = i+1 .. n-1 are stored one after another from n*i - i*(i+1)/2.
+def write_tile(out, n, tile, i0, j0):
+    j1 = j0 + tile.shape[1]
+    for r in range(tile.shape[0]):
+        i = i0 + r
+        lo = max(j0, i + 1)
+        if lo < j1:
+            start = n*i - i*(i+1)//2 + (lo - i - 1)
+            out[start:start + j1 - lo] = tile[r, lo - j0:]
+
+
+# Tiles (i0, i1, j0, j1) of block_rows x block_rows records covering the pairs i < j
+def triangle_tiles(n, block_rows):
+    for i0 in range(0, n, block_rows):
+        for j0 in range(i0, n, block_rows):
+            yield i0, min(i0 + block_rows, n), j0, min(j0 + block_rows, n)
+
+
+# Compute the condensed numerical, nominal and mixed matrices tile by tile over the upper triangle.
+# out maps a kind ('numerical', 'nominal' or 'mixed') to the array it is written to; by default all
+# three are allocated in memory.
+def vector_dissimilarity(numeric, codes, metric, p, block_rows, out=None, dtype=np.float64):
+    n = len(numeric)
+    if out is None:
+        out = {kind: np.zeros(n*(n-1)//2, dtype=dtype) for kind in ('numerical', 'nominal', 'mixed')}
+    for i0, i1, j0, j1 in triangle_tiles(n, block_rows):
+        tiles = dissimilarity_tiles(numeric, codes, i0, i1, j0, j1, metric, p)
+        for kind, tile in zip(('numerical', 'nominal', 'mixed'), tiles):
+            if kind in out:
+                write_tile(out[kind], n, tile, i0, j0)
+    return out
+
+
+# Split the columns of the schema into numerical columns divided by their range and integer-coded
+# nominal columns, each stored as one contiguous row; returns them with the number of attributes
+def gower_encode(df, schema):
+    scaled, codes = [], []
+    for key, kind in schema.items():
+        # Columns can be given by name or by position
+        name = df.columns[key] if isinstance(key, int) and key not in df.columns else key
+        column = df[name]
+        if column.isna().any():
+            raise ValueError(f"column {name!r} has missing values")
+        if kind == 'numeric':
+            if not pd.api.types.is_numeric_dtype(column):
+                raise ValueError(f"column {name!r} is not numeric")
+            values = column.to_numpy(dtype=np.float64)
+            spread = values.max() - values.min()
+            # A constant column adds 0 to every pair but still counts as an attribute
+            if spread > 0:
+                scaled.append(values/spread)
+        elif kind == 'nominal':
+            codes.append(pd.factorize(column)[0])
+        else:
+            raise ValueError(f"unknown type {kind!r} of column {name!r} (use 'numeric' or 'nominal')")
+    n = len(df)
+    return (np.array(scaled, dtype=np.float64).reshape(-1, n), np.array(codes, dtype=np.int64).reshape(-1, n),
+            len(schema))
+
+
+# Condensed Gower dissimilarity matrix. Each row of the upper triangle is built in one buffer, attribute
+# by attribute, and written to out (an array or memory map of n(n-1)/2 values, allocated when None).
+def gower_dissimilarity(scaled, codes, attributes, out=None, dtype=np.float64):
+    n = max(scaled.shape[1], codes.shape[1])
+    if out is None:
+        out = np.zeros(n*(n-1)//2, dtype=dtype)
+    row = np.empty(n)
+    scratch = np.empty(n)
+    mismatch = np.empty(n, dtype=bool)
+    start = 0
+    for i in range(n - 1):
+        m = n - i - 1
+        acc, diff, unequal = row[:m], scratch[:m], mismatch[:m]
+        acc[:] = 0
+        for x in scaled:
+            np.subtract(x[i+1:], x[i], out=diff)
+            np.abs(diff, out=diff)
+            acc += diff
+        for c in codes:
+            np.not_equal(c[i+1:], c[i], out=unequal)
+            acc += unequal
+        acc /= attributes
+        out[start:start + m] = acc
+        start += m
+    return out
+
+
+# Batched k-nearest-neighbour and radius queries over the records under one of the dissimilarities
+# (numerical, nominal, mixed or gower). For gower, numeric and codes are the scaled columns and codes
+# from gower_encode (one record per row) and attributes is the number of attributes.
+class NeighbourIndex:
+    def __init__(self, numeric, codes, kind='numerical', metric='manhattan', p=3, attributes=None,
+                 block_rows=2048, max_categories=32, workers=1):
+        self.numeric, self.codes, self.kind = numeric, codes, kind
+        self.metric, self.p, self.attributes = metric, p, attributes
+        self.n = len(numeric)
+        self.block_rows, self.workers = block_rows, workers
+        self.tree, self.tree_p = None, 1
+
+        if kind == 'numerical':
+            points = numeric
+            self.tree_p = {'manhattan': 1, 'euclidean': 2, 'minkowski': p}[metric]
+        elif kind in ('nominal', 'mixed', 'gower') and (kind != 'mixed' or metric == 'manhattan'):
+            categories = codes.max(axis=0) + 1 if len(codes) else np.zeros(0, dtype=np.int64)
+            if categories.sum() > max_categories:
+                points = None
+            else:
+                # One-hot columns of attribute f start at offsets[f]
+                offsets = np.concatenate(([0], np.cumsum(categories)[:-1])).astype(np.int64)
+                onehot = np.zeros((self.n, int(categories.sum())))
+                onehot[np.arange(self.n)[:, None], offsets + codes] = 0.5
+                points = {'nominal': onehot, 'mixed': np.hstack([numeric, onehot])/2,
+                          'gower': np.hstack([numeric, onehot])/(attributes or 1)}[kind]
+        elif kind in ('nominal', 'mixed', 'gower'):
+            points = None
+        else:
+            raise ValueError(f"unknown dissimilarity {kind!r}")
+        if points is not None:
+            self.points = points
+            self.tree = cKDTree(points)
+
+    # Dissimilarities between the records in rows and every record (brute force)
+    def distances(self, rows):
+        num, nom, mixed = dissimilarity_tiles(self.numeric[rows], self.codes[rows], 0, len(rows), 0, self.n,
+                                              'manhattan' if self.kind == 'gower' else self.metric, self.p,
+                                              self.numeric, self.codes)
+        return {'numerical': num, 'nominal': nom, 'mixed': mixed,
+                'gower': (num + nom)/(self.attributes or 1)}[self.kind]
+
+    # Blocks of query records for the brute-force search, each compared with all n records
+    def query_blocks(self, rows):
+        size = max(1, self.block_rows**2//max(self.n, 1))
+        for b in range(0, len(rows), size):
+            yield b, rows[b:b + size]
+
+    # The k nearest records of each record in rows: (dissimilarities, record numbers), nearest first
+    def knn(self, rows, k):
+        rows = np.asarray(rows, dtype=np.int64)
+        if not 0 < k < self.n:
+            raise ValueError(f"k must be between 1 and {self.n - 1}")
+        if self.tree is not None:
+            # Ask for one more neighbour, as each record finds itself
+            found, nearest = self.tree.query(self.points[rows], k + 1, p=self.tree_p, workers=self.workers)
+            keep = nearest != rows[:, None]
+            # Records pushed out of their own results by duplicates drop the farthest neighbour instead
+            keep[keep.all(axis=1), -1] = False
+            return found[keep].reshape(len(rows), k), nearest[keep].reshape(len(rows), k)
+        found = np.empty((len(rows), k))
+        nearest = np.empty((len(rows), k), dtype=np.int64)
+        for b, block in self.query_blocks(rows):
+            d = self.distances(block)
+            d[np.arange(len(block)), block] = np.inf
+            # Only the k nearest of each row are sorted
+            part = np.argpartition(d, k - 1, axis=1)[:, :k]
+            order = np.argsort(np.take_along_axis(d, part, axis=1), axis=1, kind='stable')
+            nearest[b:b + len(block)] = np.take_along_axis(part, order, axis=1)
+            found[b:b + len(block)] = np.take_along_axis(d, nearest[b:b + len(block)], axis=1)
+        return found, nearest
+
+    # Record numbers within distance r of each record in rows, in increasing order
+    def radius(self, rows, r):
+        rows = np.asarray(rows, dtype=np.int64)
+        if self.tree is not None:
+            found = self.tree.query_ball_point(self.points[rows], r, p=self.tree_p, workers=self.workers,
+                                               return_sorted=True)
+            return [np.array([j for j in near if j != i], dtype=np.int64) for i, near in zip(rows, found)]
+        result = []
+        for b, block in self.query_blocks(rows):
+            d = self.distances(block)
+            d[np.arange(len(block)), block] = np.inf
+            result += [np.flatnonzero(row <= r) for row in d]
+        return result
+
+
+# Time the neighbour index against the full matrix plus a sort of every row on random records
+def neighbour_benchmark(sizes, k, matrix_rows, metric, p, block_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    for n in sizes:
+        df = pd.DataFrame({'age': rng.integers(18, 65, n), 'salary': rng.normal(60, 20, n)})
+        numeric, codes = encode(df, None, [])
+        start = time.perf_counter()
+        index = NeighbourIndex(numeric, codes, 'numerical', metric, p, block_rows=block_rows)
+        build = time.perf_counter() - start
+        found, nearest = index.knn(np.arange(n), k)
+        query = time.perf_counter() - start - build
+        line = f"n = {n:,}: index build {build:.3f} s, query {query:.3f} s"
+        if n <= matrix_rows:
+            start = time.perf_counter()
+            matrix = squareform(vector_dissimilarity(numeric, codes, metric, p, block_rows,
+                                                     {'numerical': np.zeros(n*(n-1)//2)})['numerical'])
+            np.fill_diagonal(matrix, np.inf)
+            order = np.argsort(matrix, axis=1)[:, :k]
+            full = time.perf_counter() - start
+            same = np.allclose(np.take_along_axis(matrix, order, axis=1), found)
+            del matrix, order
+            line += f", full matrix + argsort {full:.3f} s ({full/(build + query):,.0f}x), same distances: {same}"
+        print(line)
+
+
+# Inputs and outputs of a worker process, set once by attach_worker
+worker_state = {}
+
+
+# Copy an array into a new shared memory block; returns the block and what a worker needs to attach to it
+def share(array):
+    shm = SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, array.dtype, buffer=shm.buf)[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+# View of a shared memory block as an array; the block is kept open for the life of the worker
+def attach(name, shape, dtype):
+    shm = SharedMemory(name=name)
+    worker_state.setdefault('blocks', []).append(shm)
+    return np.ndarray(shape, dtype, buffer=shm.buf)
+
+
+# Zero-filled shared memory blocks for the condensed matrices of n records, which the workers of
+# parallel_dissimilarity write into. arrays (kind -> array) views them in place and is valid until
+# close(); other views of the arrays must be deleted before that.
+class SharedMatrices:
+    def __init__(self, n, kinds, dtype):
+        dtype = np.dtype(dtype)
+        shape = (n*(n-1)//2,)
+        self.blocks, self.specs, self.arrays = [], {}, {}
+        for kind in kinds:
+            # A new block starts out filled with zeros, so nothing is copied into it
+            block = SharedMemory(create=True, size=max(shape[0]*dtype.itemsize, 1))
+            self.blocks.append(block)
+            self.specs[kind] = (block.name, shape, dtype.str)
+            self.arrays[kind] = np.ndarray(shape, dtype, buffer=block.buf)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.arrays = {}
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+# Attach a worker process to the shared records and to its outputs: shared blocks or .npy files
+def attach_worker(numeric, codes, outputs, metric, p):
+    worker_state['numeric'] = attach(*numeric)
+    worker_state['codes'] = attach(*codes)
+    worker_state['out'] = {kind: attach(*output) if isinstance(output, tuple) else np.load(output, mmap_mode='r+')
+                           for kind, output in outputs.items()}
+    worker_state['metric'], worker_state['p'] = metric, p
+
+
+# Compute one tile and write it straight into the outputs (runs in a worker process)
+def compute_tile(tile):
+    i0, i1, j0, j1 = tile
+    state = worker_state
+    n = len(state['numeric'])
+    tiles = dissimilarity_tiles(state['numeric'], state['codes'], i0, i1, j0, j1, state['metric'], state['p'])
+    for kind, values in zip(('numerical', 'nominal', 'mixed'), tiles):
+        if kind in state['out']:
+            write_tile(state['out'][kind], n, values, i0, j0)
+    return tile_pairs(tile)
+
+
+# Number of pairs i < j in a tile
+def tile_pairs(tile):
+    i0, i1, j0, j1 = tile
+    return (i1 - i0)*(i1 - i0 - 1)//2 if i0 == j0 else (i1 - i0)*(j1 - j0)
+
+
+# Compute the condensed matrices on a process pool, writing them into out: a SharedMatrices, or the
+# .npy files of a dictionary kind -> path
+def parallel_dissimilarity(numeric, codes, metric, p, block_rows, workers, out, progress=True):
+    n = len(numeric)
+    outputs = out.specs if isinstance(out, SharedMatrices) else out
+    blocks = []
+    try:
+        numeric_block, numeric_spec = share(numeric)
+        codes_block, codes_spec = share(codes)
+        blocks += [numeric_block, codes_block]
+
+        # Largest tiles first, handed out one at a time as workers become free
+        tiles = sorted(triangle_tiles(n, block_rows), key=tile_pairs, reverse=True)
+        total, done = sum(map(tile_pairs, tiles)), 0
+        with Pool(workers, attach_worker, (numeric_spec, codes_spec, outputs, metric, p)) as pool:
+            for k, pairs in enumerate(pool.imap_unordered(compute_tile, tiles), 1):
+                done += pairs
+                if progress:
+                    print(f"\r{k}/{len(tiles)} tiles, {done/max(total, 1):.0%} of pairs", end='', file=sys.stderr)
+        if progress:
+            print(file=sys.stderr)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+# Time the parallel engine on random records with each number of workers, checking that the
+# results are bit-identical to the serial engine
+def scaling_benchmark(n, workers_list, metric, p, block_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'age': rng.integers(18, 65, n), 'salary': rng.integers(20, 100, n)})
+    numeric, codes = encode(df, None, None)
+    start = time.perf_counter()
+    serial = vector_dissimilarity(numeric, codes, metric, p, block_rows)
+    base = time.perf_counter() - start
+    print(f"n = {n:,}: serial {base:.2f} s")
+    for w in workers_list:
+        with SharedMatrices(n, list(serial), np.float64) as shared:
+            start = time.perf_counter()
+            parallel_dissimilarity(numeric, codes, metric, p, block_rows, w, shared, progress=False)
+            elapsed = time.perf_counter() - start
+            same = all(np.array_equal(shared.arrays[kind], serial[kind]) for kind in serial)
+        print(f"\t{w} workers: {elapsed:.2f} s ({base/elapsed:.2f}x), bit-identical: {same}")
+
+
+# Compute the matrices tile by tile straight into memory-mapped .npy files in output_dir
+# (layout above) and return the path of each file
+def disk_dissimilarity(numeric, codes, metric, p, block_rows, output_dir, kinds, dtype, workers=1, progress=True):
+    os.makedirs(output_dir, exist_ok=True)
+    n = len(numeric)
+    paths = {kind: os.path.join(output_dir, f'{kind}.npy') for kind in kinds}
+    out = {kind: np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(n*(n-1)//2,))
+           for kind, path in paths.items()}
+    if workers > 1:
+        # The workers open the files themselves and write their tiles into them
+        del out
+        parallel_dissimilarity(numeric, codes, metric, p, block_rows, workers, paths, progress)
+    else:
+        vector_dissimilarity(numeric, codes, metric, p, block_rows, out)
+        for matrix in out.values():
+            matrix.flush()
+    with open(os.path.join(output_dir, 'layout.json'), 'w') as f:
+        json.dump({'n': n, 'dtype': np.dtype(dtype).name, 'layout': 'condensed upper triangle',
+                   'files': {kind: os.path.basename(path) for kind, path in paths.items()}}, f, indent=2)
+    return paths
+
+
+# Lazy reader of a condensed matrix file written by the disk engine.
+# The file is memory-mapped, so only the pairs asked for are read from disk.
+class DissimilarityReader:
+    def __init__(self, path):
+        self.data = np.load(path, mmap_mode='r')
+        # n(n-1)/2 values in the file
+        self.n = (1 + math.isqrt(1 + 8*len(self.data)))//2
+
+    # Positions of the pairs (i, j) in the file, for arrays of i and j with i < j
+    def positions(self, i, j):
+        return self.n*i - i*(i+1)//2 + (j - i - 1)
+
+    # Row i of the square matrix
+    def row(self, i):
+        row = np.zeros(self.n, dtype=self.data.dtype)
+        # Pairs with the records before i are spread over the file, those after i are contiguous
+        before = np.arange(i, dtype=np.int64)
+        row[:i] = self.data[self.positions(before, i)]
+        start = self.positions(i, i + 1)
+        row[i+1:] = self.data[start:start + self.n - i - 1]
+        return row
+
+    # Tile of the square matrix for the given record numbers (arrays or ranges)
+    def tile(self, rows, cols):
+        i = np.asarray(rows, dtype=np.int64)[:, None]
+        j = np.asarray(cols, dtype=np.int64)[None, :]
+        low, high = np.minimum(i, j), np.maximum(i, j)
+        diagonal = low == high
+        tile = self.data[np.where(diagonal, 0, self.positions(low, high))]
+        tile[diagonal] = 0
+        return tile
+
+
+# Time the loop method (scaled up from a few records) against the vector engine on random records
+def benchmark(sizes, loop_rows, metric, p, block_rows, memory=2**31, seed=0):
+    rng = np.random.default_rng(seed)
+    small = pd.DataFrame({'age': rng.integers(18, 65, loop_rows), 'salary': rng.integers(20, 100, loop_rows)})
+    start = time.perf_counter()
+    loop_dissimilarity(small)
+    loop_per_pair = (time.perf_counter() - start)/loop_rows**2
+    for n in sizes:
+        df = pd.DataFrame({'age': rng.integers(18, 65, n), 'salary': rng.integers(20, 100, n)})
+        numeric, codes = encode(df, None, None)
+        # An empty dictionary of outputs computes every tile and keeps none
+        stored = 3*8*(n*(n-1)//2) <= memory
+        start = time.perf_counter()
+        matrices = vector_dissimilarity(numeric, codes, metric, p, block_rows, out=None if stored else {})
+        elapsed = time.perf_counter() - start
+        del matrices
+        loop = loop_per_pair*n**2
+        print(f"n = {n:,}: loop ~{loop:,.0f} s (estimated), vector {elapsed:.2f} s ({loop/elapsed:,.0f}x)"
+              + ("" if stored else " (tiles discarded)"))
+
+
+if __name__ == '__main__':
+    if engine == 'benchmark':
+        benchmark(benchmark_sizes, benchmark_loop_rows, metric, minkowski_p, block_rows, benchmark_memory)
+        raise SystemExit
+    if engine == 'scaling':
+        scaling_benchmark(scaling_rows, benchmark_workers, metric, minkowski_p, block_rows)
+        raise SystemExit
+    if engine == 'neighbour_benchmark':
+        neighbour_benchmark(benchmark_sizes, neighbours, benchmark_matrix_rows, metric, minkowski_p, block_rows)
+        raise SystemExit
+
+    # Read the input data
+    df = pd.read_csv(file_path)
+
+    if engine == 'vector':
+        numeric, codes = encode(df, numeric_columns, nominal_columns)
+        matrices = vector_dissimilarity(numeric, codes, metric, minkowski_p, block_rows, dtype=dtype)
+    elif engine == 'parallel':
+        numeric, codes = encode(df, numeric_columns, nominal_columns)
+        shared = SharedMatrices(len(numeric), kinds, dtype)
+        parallel_dissimilarity(numeric, codes, metric, minkowski_p, block_rows, workers, shared, progress)
+        matrices = shared.arrays
+    elif engine == 'gower':
+        scaled, codes, attributes = gower_encode(df, schema)
+        matrices = {'gower': gower_dissimilarity(scaled, codes, attributes, dtype=dtype)}
+    elif engine == 'neighbours':
+        if neighbour_kind == 'gower':
+            scaled, codes, attributes = gower_encode(df, schema)
+            index = NeighbourIndex(scaled.T, codes.T, 'gower', attributes=attributes, block_rows=block_rows,
+                                   max_categories=max_categories)
         else:
-            # Matrix is symmetric, copy from lower triangle
-            mix_dissmat[i][j] = mix_dissmat[j][i]
-
-# Print matrices without row/column labels for clarity
-print("Numerical Dissimilarity Matrix:")
-print(pd.DataFrame(num_dissmat).to_string(index=False, header=False))
-print("\nNominal Dissimilarity Matrix:")
-print(pd.DataFrame(nom_dissmat).to_string(index=False, header=False))
-print("\nMixed Dissimilarity Matrix:")
-print(pd.DataFrame(mix_dissmat).to_string(index=False, header=False))
\ No newline at end of file
+            numeric, codes = encode(df, numeric_columns, nominal_columns)
+            index = NeighbourIndex(numeric, codes, neighbour_kind, metric, minkowski_p, block_rows=block_rows,
+                                   max_categories=max_categories)
+        rows = np.arange(index.n)
+        found, nearest = index.knn(rows, min(neighbours, index.n - 1))
+        print(f"{neighbour_kind.capitalize()} nearest records ({'tree' if index.tree is not None else 'brute force'}):")
+        for i in rows:
+            print(f"{i}: " + ", ".join(f"{j} ({d:g})" for j, d in zip(nearest[i], found[i])))
+        if radius is not None:
+            print(f"\nRecords within {radius:g}:")
+            for i, near in zip(rows, index.radius(rows, radius)):
+                print(f"{i}: {list(near)}")
+        raise SystemExit
+    elif engine == 'disk':
+        numeric, codes = encode(df, numeric_columns, nominal_columns)
+        paths = disk_dissimilarity(numeric, codes, metric, minkowski_p, block_rows, output_dir, kinds, dtype,
+                                   workers, progress)
+        readers = {kind: DissimilarityReader(path) for kind, path in paths.items()}
+        for kind, path in paths.items():
+            print(f"{kind}: {path} ({os.path.getsize(path):,} bytes)")
+        print()
+        # Read the matrices back row by row (only small ones are printed)
+        matrices = {kind: np.array([reader.row(i) for i in range(reader.n)]) if reader.n <= 20 else None
+                    for kind, reader in readers.items()}
+    else:
+        matrices = dict(zip(('numerical', 'nominal', 'mixed'), loop_dissimilarity(df)))
+
+    # Print matrices without row/column labels for clarity
+    titles = {'numerical': "Numerical Dissimilarity Matrix:", 'nominal': "Nominal Dissimilarity Matrix:",
+              'mixed': "Mixed Dissimilarity Matrix:", 'gower': "Gower Dissimilarity Matrix:"}
+    for k, (kind, matrix) in enumerate(matrices.items()):
+        if matrix is None:
+            continue
+        if matrix.ndim == 1:
+            # Mirror the condensed upper triangle into the full symmetric matrix, or show it as one row
+            matrix = squareform(matrix) if square else matrix[None, :]
+        print(("\n" if k else "") + titles[kind])
+        print(pd.DataFrame(matrix).to_string(index=False, header=False))
+
+    # Free the shared memory of the parallel engine once nothing views it
+    if engine == 'parallel':
+        del matrix, matrices
+        shared.close()
@@ -44,67 +44,587 @@ Interpret Results
 If correlation > 0: Positive correlation
 If correlation < 0: Negative correlation
 If correlation = 0: No correlation
+
+Matrix Engine (engine = 'matrix'):
+
+Covariance and correlation of every pair of the p numeric columns at once.
+First pass: read the file in chunks of chunksize rows and add up, for every column, the count, the sum and the
+sum of squares of the values shifted by the first row (the shift keeps the sums small, so the variance is
+not lost to cancellation). This gives the mean and standard deviation of every column.
+Second pass: read the chunks again, center and scale each one once (z = (x - mean)/sd) and add Z^T Z to a
+p x p accumulator; the product is a single BLAS matrix multiplication per chunk.
+Correlation = accumulator/(n-1), Covariance = Correlation * sd_i * sd_j.
+Only one chunk is in memory at a time, so the file may be larger than memory. With dtype = 'float32' the
+standardized chunks and their product are float32 (twice as fast, about 1e-6 relative error); the
+accumulator is always float64.
+Rows with a missing value in any of the columns are left out (pandas' corr() leaves them out pair by pair).
+
+Stream Engine (engine = 'stream' or 'parallel'):
+
+Keep, instead of the data, the count n, the mean vector and the co-moment matrix C = Σ (x - mean)(x - mean)^T
+of the rows seen so far. A chunk of rows is summarised on its own and merged in with the pairwise update of
+Chan et al.: for parts a and b, delta = mean_b - mean_a,
+mean = mean_a + delta*n_b/n and C = C_a + C_b + delta delta^T * n_a*n_b/n,
+which never subtracts large sums from each other. Covariance = C/(n-1) and
+Correlation_ij = C_ij/sqrt(C_ii*C_jj) can be read at any time.
+Accumulators built on separate chunks, shards or processes merge in any order, so the parallel engine
+summarises the shards (or the chunks of a single file) on a process pool and merges the results.
+The stream engine reads the file (or standard input with file_path = '-', for a live feed) in one pass and
+prints the running matrices every report_every chunks.
+
+Rank Engine (engine = 'rank'):
+
+Pearson's correlation is thrown off by skewed columns and outliers, so also report two rank correlations for
+every pair of columns.
+Spearman: replace the values of every column by their ranks (tied values share the average of their ranks)
+and take Pearson's correlation of the ranks, for all pairs at once with the matrix engine.
+Kendall tau-b (Knight's algorithm, O(n log n) instead of comparing all n(n-1)/2 pairs):
+Sort the rows by x, then by y. n0 = n(n-1)/2, n1 = pairs tied in x, n2 = pairs tied in y, n3 = pairs tied
+in both.
+Sort the y sequence with a bottom-up merge sort. Each pass merges all pairs of neighbouring runs at once:
+a value of a right run passes as many values of its left run as are greater than it, found by binary
+search, and the number of passes summed over the whole sort is the number of discordant pairs (swaps).
+tau_b = (n0 - n1 - n2 + n3 - 2*swaps)/sqrt((n0 - n1)*(n0 - n2)).
+Rank benchmark (engine = 'rank_benchmark'): time both on rank_benchmark_sizes rows against scipy, and the
+naive O(n^2) Kendall tau (timed on rank_naive_rows rows and scaled up by the number of pairs).
+
+Resampling (n_resamples > 0, list engine):
+
+Bootstrap confidence interval: draw n_resamples samples of n rows with replacement (rows keep their A and B
+together), compute the correlation of each and take the (1-confidence)/2 and (1+confidence)/2 quantiles.
+Permutation p-value: shuffle B against A n_resamples times; the p-value is
+(1 + number of shuffles with |r| >= |observed r|)/(n_resamples + 1).
+The resamples are generated in batches as a (batch x n) array of row numbers, and the statistic of the whole
+batch is computed at once with array operations. The batch size keeps a batch within batch_memory bytes.
+Every batch has its own random generator, spawned from seed, so the results are the same with or without
+a process pool (resample_workers > 1).
+The same engine gives the significance of Cramer's V in EXP6-b.
 ---------------------------------------------------------------------------------
 """
 
+import math
+import sys
+import time
+from functools import partial
+from multiprocessing import Pool
+
 import pandas as pd 
 import numpy as np
 
-# Read CSV file into DataFrame
-df = pd.read_csv('data/Corr_Num_Attr.csv')
-n = len(df)
-
-# Convert columns to lists for manual calculation
-col1 = df['A'].tolist()
-col2 = df["B"].tolist()
-
-# Step 1: Calculate means for both columns
-col1_mean = sum(col1)/n
-col2_mean = sum(col2)/n
-
-# Step 2: Calculate covariance
-# Formula: Covariance = Σ((x-x̄)(y-ȳ))/(n-1)
-summation = 0
-for i in range(n):
-    summation += (col1[i]-col1_mean)*(col2[i]-col2_mean)
-cov = summation/(n-1)
-
-# Step 3: Calculate variance and standard deviation for X
-# Formula: σ² = Σ(x-x̄)²/(n-1)
-var_x = 0
-for i in range(n):
-    var_x += (col1[i]-col1_mean)**2
-var_x = var_x/(n-1)
-sd_X = np.sqrt(var_x)
-
-# Step 4: Calculate variance and standard deviation for Y
-var_y = 0
-for i in range(n):
-    var_y += (col2[i]-col2_mean)**2
-var_y = var_y/(n-1) 
-sd_Y = np.sqrt(var_y)
-
-# Step 5: Calculate correlation coefficient
-# Formula: ρ = covariance/(sd_X * sd_Y)
-corr = cov/(sd_X*sd_Y)
-
-# Display manual calculation results
-print("Manually Computed Values:")
-print(f"\tCovariance : {cov}")
-print(f"\tCorrelation : {corr}")
-
-# Compare with pandas built-in functions
-print("Using Pandas:")
-print(f"\tCovariance : {df['A'].cov(df['B'])}")
-print(f"\tCorrelation : {df['A'].corr(df['B'])}")
-
-# Interpret correlation result
-# Positive: variables move in same direction
-# Negative: variables move in opposite directions
-# Zero: no linear relationship
-if corr>0:
-    print("Positive Correlation")
-elif corr<0:
-    print("Negative Correlation")
-else:
-    print("No Correlation")
+# File to read
+file_path = 'Data/Corr_Num_Attr.csv'
+# Engine used to compute the correlation:
+#   'list' - two columns A and B with loops over Python lists (steps above)
+#   'matrix' - covariance and correlation matrices of many columns, two chunked passes
+#   'stream' - one pass with a mergeable co-moment accumulator
+#   'parallel' - co-moment accumulators of the shards built on a process pool and merged
+#   'rank' - Pearson, Spearman and Kendall tau-b matrices of the columns
+#   'rank_benchmark' - time the rank correlations on random data
+engine = 'list'
+# Columns used by the matrix, stream and parallel engines (None = every numeric column; needed for standard input)
+columns = None
+# Number of rows read per chunk
+chunksize = 100000
+# Stream engine: print the running matrices every report_every chunks (None = only at the end)
+report_every = None
+# Rank benchmark: numbers of rows generated, and number of rows the naive Kendall tau is timed on
+rank_benchmark_sizes = [10**5, 10**6, 10**7]
+rank_naive_rows = 2000
+# Shard files read by the parallel engine, e.g. glob.glob('Data/prices-*.csv');
+# a single file is split into chunks instead
+shards = [file_path]
+# Number of worker processes used by the parallel engine (None = all cores)
+workers = None
+# Matrix engine: data type of the standardized chunks and their product ('float64' or 'float32')
+dtype = 'float64'
+# Matrix engine: compare the result with pandas' corr() (reads the whole file into memory)
+compare_pandas = True
+# Number of bootstrap and permutation resamples of the correlation (0 = no resampling)
+n_resamples = 0
+# Confidence level of the bootstrap interval
+confidence = 0.95
+# Largest memory used by one batch of resamples, in bytes
+batch_memory = 2**28
+# Seed of the random generator (None = different resamples on every run)
+seed = 0
+# Worker processes the batches are spread over (1 = this process)
+resample_workers = 1
+
+
+# Covariance and correlation of two columns with loops over Python lists
+def list_correlation(col1, col2):
+    n = len(col1)
+
+    # Step 1: Calculate means for both columns
+    col1_mean = sum(col1)/n
+    col2_mean = sum(col2)/n
+
+    # Step 2: Calculate covariance
+    # Formula: Covariance = Σ((x-x̄)(y-ȳ))/(n-1)
+    summation = 0
+    for i in range(n):
+        summation += (col1[i]-col1_mean)*(col2[i]-col2_mean)
+    cov = summation/(n-1)
+
+    # Step 3: Calculate variance and standard deviation for X
+    # Formula: σ² = Σ(x-x̄)²/(n-1)
+    var_x = 0
+    for i in range(n):
+        var_x += (col1[i]-col1_mean)**2
+    var_x = var_x/(n-1)
+    sd_X = np.sqrt(var_x)
+
+    # Step 4: Calculate variance and standard deviation for Y
+    var_y = 0
+    for i in range(n):
+        var_y += (col2[i]-col2_mean)**2
+    var_y = var_y/(n-1) 
+    sd_Y = np.sqrt(var_y)
+
+    # Step 5: Calculate correlation coefficient
+    # Formula: ρ = covariance/(sd_X * sd_Y)
+    corr = cov/(sd_X*sd_Y)
+
+    return cov, corr
+
+
+# Read the numeric columns of a file (or standard input for '-') in chunks of float arrays,
+# leaving out rows with missing values
+def read_chunks(file_path, columns, chunksize):
+    source = sys.stdin if file_path == '-' else file_path
+    for chunk in pd.read_csv(source, usecols=columns, chunksize=chunksize):
+        if columns is None:
+            chunk = chunk.select_dtypes('number')
+        yield chunk.dropna().to_numpy(dtype=np.float64)
+
+
+# Covariance and correlation matrices (p x p) of the chunks returned by chunks(), which is called once
+# per pass. Returns (covariance, correlation, means, standard deviations, number of rows).
+def matrix_correlation(chunks, dtype=np.float64):
+    # First pass: count, sum and sum of squares of the values shifted by the first row
+    n, shift, total, squares = 0, None, 0, 0
+    for chunk in chunks():
+        if not len(chunk):
+            continue
+        if shift is None:
+            shift = chunk[0].copy()
+        shifted = chunk - shift
+        n += len(chunk)
+        total = total + shifted.sum(axis=0)
+        squares = squares + np.einsum('ij,ij->j', shifted, shifted)
+    if n < 2:
+        raise ValueError("at least two complete rows are needed")
+    means = shift + total/n
+    sds = np.sqrt((squares - total**2/n)/(n - 1))
+
+    # Second pass: standardize each chunk once and add its Gram matrix.
+    # Constant columns are only centered; their correlations are undefined (NaN).
+    scale = np.where(sds > 0, sds, 1)
+    gram = 0
+    for chunk in chunks():
+        z = ((chunk - means)/scale).astype(dtype, copy=False)
+        gram = gram + (z.T @ z).astype(np.float64)
+    corr = gram/(n - 1)
+    cov = corr*np.outer(scale, scale)
+    corr[sds == 0, :] = np.nan
+    corr[:, sds == 0] = np.nan
+    return cov, corr, means, sds, n
+
+
+# Names of the numeric columns of a file, read from its first rows
+def numeric_columns(file_path, columns):
+    if columns is not None:
+        return columns
+    if file_path == '-':
+        raise ValueError("set columns to read standard input")
+    return list(pd.read_csv(file_path, nrows=1000).select_dtypes('number').columns)
+
+
+# Mergeable co-moments of a stream of rows: count, mean vector and co-moment matrix (sum of the
+# outer products of the deviations from the mean). Accumulators built on separate chunks, shards
+# or processes combine with merge() in any grouping; covariance and correlation can be read at any time.
+class CoMoments:
+    def __init__(self):
+        self.count = 0
+        self.average = 0.0
+        self.comoment = 0.0
+
+    def update(self, rows):
+        rows = np.atleast_2d(np.asarray(rows, dtype=np.float64))
+        if len(rows) == 0:
+            return self
+        # Co-moments of the chunk on its own, then merge them in
+        chunk = CoMoments()
+        chunk.count = len(rows)
+        chunk.average = rows.mean(axis=0)
+        deviations = rows - chunk.average
+        chunk.comoment = deviations.T @ deviations
+        return self.merge(chunk)
+
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        n = self.count + other.count
+        # Pairwise (Chan et al.) update of the mean and co-moments
+        delta = other.average - self.average
+        self.comoment = self.comoment + other.comoment + np.outer(delta, delta) * self.count * other.count / n
+        self.average = self.average + delta * other.count / n
+        self.count = n
+        return self
+
+    def mean(self):
+        return self.average
+
+    def covariance(self):
+        return self.comoment / (self.count - 1)
+
+    def correlation(self):
+        sd = np.sqrt(np.diag(self.comoment))
+        # Constant columns have no correlation (NaN)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.comoment / np.outer(sd, sd)
+
+
+# Co-moments of one chunk of rows (runs in a worker process)
+def comoments_of_chunk(rows):
+    return CoMoments().update(rows)
+
+
+# Co-moments of one shard file read chunk by chunk (runs in a worker process)
+def comoments_of_file(file_path, columns, chunksize):
+    moments = CoMoments()
+    for rows in read_chunks(file_path, columns, chunksize):
+        moments.update(rows)
+    return moments
+
+
+# Build co-moments per shard (or per chunk of a single shard) on a process pool and merge them
+def parallel_comoments(shards, columns, chunksize, workers=None):
+    moments = CoMoments()
+    with Pool(workers) as pool:
+        if len(shards) == 1:
+            parts = pool.imap_unordered(comoments_of_chunk, read_chunks(shards[0], columns, chunksize))
+        else:
+            parts = pool.imap_unordered(partial(comoments_of_file, columns=columns, chunksize=chunksize), shards)
+        for part in parts:
+            moments.merge(part)
+    return moments
+
+
+# Read a file or standard input once, printing the running matrices every report_every chunks
+def stream_comoments(file_path, columns, chunksize, report_every=None):
+    moments = CoMoments()
+    for k, rows in enumerate(read_chunks(file_path, columns, chunksize), 1):
+        moments.update(rows)
+        if report_every and k % report_every == 0 and moments.count > 1:
+            print(f"After {moments.count} rows:")
+            print_matrices(moments.covariance(), moments.correlation(), columns)
+    return moments
+
+
+# Ranks of the values of every column (1 = smallest); tied values get the average of their ranks
+def average_ranks(table):
+    table = np.asarray(table, dtype=np.float64).reshape(len(table), -1)
+    ranks = np.empty(table.shape)
+    for f in range(table.shape[1]):
+        order = np.argsort(table[:, f])
+        values = table[order, f]
+        # Every run of equal values gets the mean of first and last rank of the run
+        starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+        ends = np.r_[starts[1:], len(values)]
+        ranks[order, f] = np.repeat((starts + ends + 1)/2, ends - starts)
+    return ranks
+
+
+# Dense ranks (0, 1, 2, ... with equal values sharing one rank) and the number of tied pairs
+def dense_ranks(values):
+    unique, ranks, counts = np.unique(values, return_inverse=True, return_counts=True)
+    return ranks.astype(np.int64), int(np.sum(counts*(counts - 1)//2))
+
+
+# Number of pairs i < j with values[i] > values[j], for integers between 0 and n-1.
+# Bottom-up merge sort where each pass merges every pair of neighbouring runs at once: the runs are
+# lifted by run number * (n+1) so that all left runs form one sorted array, and a binary search gives,
+# for every right value, how many values of its left run go before it. Runs of the first `base` values
+# are counted by comparing every pair instead.
+def count_inversions(values, base=32):
+    a = np.asarray(values, dtype=np.int64)
+    n = len(a)
+    # Pad to whole runs with values larger than all others (they add no inversions)
+    blocks = -(-n // base)
+    runs = np.full(blocks*base, n, dtype=np.int64)
+    runs[:n] = a
+    runs = runs.reshape(blocks, base)
+    inversions = 0
+    for k in range(1, base):
+        inversions += int(np.count_nonzero(runs[:, :k] > runs[:, k:k+1]))
+    a = np.sort(runs, axis=1).ravel()
+    width = base
+    while width < n:
+        blocks = -(-n // (2*width))
+        runs = np.full(blocks*2*width, n, dtype=np.int64)
+        size = min(len(a), len(runs))
+        runs[:size] = a[:size]
+        runs = runs.reshape(blocks, 2, width)
+        lift = (np.arange(blocks, dtype=np.int64)*(n + 1))[:, None]
+        left, right = (runs[:, 0] + lift).ravel(), (runs[:, 1] + lift).ravel()
+        # Values of the left run not greater than each right value; the others are passed by it
+        first = (np.arange(blocks, dtype=np.int64)*width)[:, None]
+        left_before = np.searchsorted(left, right, 'right').reshape(blocks, width) - first
+        inversions += int(np.sum(width - left_before))
+        # Merge: a right value lands at its run start + its place in its run + the left values before it,
+        # and the left values fill the remaining places in order
+        start = (np.arange(blocks, dtype=np.int64)*2*width)[:, None]
+        place = np.arange(width, dtype=np.int64)[None, :]
+        taken = np.zeros(blocks*2*width, dtype=bool)
+        taken[(start + place + left_before).ravel()] = True
+        merged = np.empty(blocks*2*width, dtype=np.int64)
+        merged[taken] = runs[:, 1].ravel()
+        merged[~taken] = runs[:, 0].ravel()
+        a = merged
+        width *= 2
+    return inversions
+
+
+# Kendall tau-b of two columns with Knight's O(n log n) algorithm
+def kendall_tau_b(x, y):
+    n = len(x)
+    x_ranks, n1 = dense_ranks(x)
+    y_ranks, n2 = dense_ranks(y)
+    # Sort the rows by x, then by y
+    joint = x_ranks*n + y_ranks
+    order = np.argsort(joint)
+    joint = joint[order]
+    # Runs of equal (x, y) in the sorted rows
+    starts = np.flatnonzero(np.r_[True, joint[1:] != joint[:-1]])
+    joint_counts = np.diff(np.r_[starts, n])
+    n3 = int(np.sum(joint_counts*(joint_counts - 1)//2))
+    n0 = n*(n - 1)//2
+    # A constant column has no untied pairs: tau-b is undefined, as in scipy
+    if n0 == n1 or n0 == n2:
+        return np.nan
+    swaps = count_inversions(y_ranks[order])
+    return (n0 - n1 - n2 + n3 - 2*swaps) / math.sqrt((n0 - n1)*(n0 - n2))
+
+
+# Spearman and Kendall tau-b matrices of every pair of columns of a table (rows x columns)
+def rank_correlation(table):
+    table = np.asarray(table, dtype=np.float64)
+    p = table.shape[1]
+    spearman = matrix_correlation(lambda: iter([average_ranks(table)]))[1]
+    kendall = np.eye(p)
+    # Undefined for a constant column, like its Spearman correlations
+    constant = np.flatnonzero(np.isnan(np.diag(spearman)))
+    kendall[constant, constant] = np.nan
+    for i in range(p):
+        for j in range(i + 1, p):
+            kendall[i, j] = kendall[j, i] = kendall_tau_b(table[:, i], table[:, j])
+    return spearman, kendall
+
+
+# Kendall tau-b comparing all pairs of rows (O(n^2), for the benchmark)
+def naive_kendall_tau_b(x, y):
+    concordant = discordant = tied_x = tied_y = 0
+    n = len(x)
+    for i in range(n):
+        for j in range(i + 1, n):
+            sign = (x[i] - x[j]) * (y[i] - y[j])
+            if sign > 0:
+                concordant += 1
+            elif sign < 0:
+                discordant += 1
+            else:
+                tied_x += x[i] == x[j]
+                tied_y += y[i] == y[j]
+    n0 = n*(n - 1)//2
+    if n0 == tied_x or n0 == tied_y:
+        return np.nan
+    return (concordant - discordant) / math.sqrt((n0 - tied_x)*(n0 - tied_y))
+
+
+# Time Spearman and Kendall tau-b on skewed random columns with ties against scipy and the naive Kendall tau
+def rank_benchmark(sizes, naive_rows, seed=0):
+    from scipy import stats
+    rng = np.random.default_rng(seed)
+    x = np.round(rng.lognormal(0, 1, naive_rows), 1)
+    y = np.round(x + rng.lognormal(0, 1, naive_rows), 1)
+    start = time.perf_counter()
+    naive_kendall_tau_b(x.tolist(), y.tolist())
+    naive_per_pair = (time.perf_counter() - start)/(naive_rows*(naive_rows - 1)/2)
+    for n in sizes:
+        x = np.round(rng.lognormal(0, 1, n), 1)
+        y = np.round(x + rng.lognormal(0, 1, n), 1)
+        start = time.perf_counter()
+        rho = matrix_correlation(lambda: iter([average_ranks(np.column_stack([x, y]))]))[1][0, 1]
+        spearman = time.perf_counter() - start
+        start = time.perf_counter()
+        tau = kendall_tau_b(x, y)
+        kendall = time.perf_counter() - start
+        start = time.perf_counter()
+        scipy_rho = stats.spearmanr(x, y).statistic
+        scipy_spearman = time.perf_counter() - start
+        start = time.perf_counter()
+        scipy_tau = stats.kendalltau(x, y).statistic
+        scipy_kendall = time.perf_counter() - start
+        naive = naive_per_pair*n*(n - 1)/2
+        print(f"n = {n:,}: Spearman {spearman:.2f} s (scipy {scipy_spearman:.2f} s, difference "
+              f"{abs(rho - scipy_rho):.1e}), Kendall tau-b {kendall:.2f} s (scipy {scipy_kendall:.2f} s, difference "
+              f"{abs(tau - scipy_tau):.1e}, naive ~{naive:,.0f} s estimated)")
+
+
+# Pearson's correlation of every row of two (resamples x n) arrays
+def pearson_batch(x, y):
+    x = x - x.mean(axis=1, keepdims=True)
+    y = y - y.mean(axis=1, keepdims=True)
+    # Resamples with a constant column have no correlation (NaN)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.einsum('ij,ij->i', x, y) / np.sqrt(np.einsum('ij,ij->i', x, x)*np.einsum('ij,ij->i', y, y))
+
+
+# Data and statistic of the resampling workers, set once by attach_resampling
+worker_state = {}
+
+
+# Give a worker process (or this process) the statistic, the two columns and the kind of resampling
+def attach_resampling(statistic, x, y, kind):
+    worker_state.update(statistic=statistic, x=x, y=y, kind=kind)
+
+
+# Statistic of one batch of resamples, drawn with the batch's own random generator
+def resample_batch(task):
+    seed, count = task
+    state = worker_state
+    x, y = state['x'], state['y']
+    n = len(x)
+    rng = np.random.default_rng(seed)
+    if state['kind'] == 'bootstrap':
+        # Rows drawn with replacement, keeping x and y together
+        rows = rng.integers(0, n, size=(count, n))
+        return state['statistic'](x[rows], y[rows])
+    # Permutation: y shuffled against a fixed x
+    rows = rng.permuted(np.tile(np.arange(n), (count, 1)), axis=1)
+    return state['statistic'](np.broadcast_to(x, (count, n)), y[rows])
+
+
+# Statistic of n_resamples bootstrap or permutation resamples of two columns, computed in batches.
+# statistic takes two (batch x n) arrays and returns one value per row. A batch holds its row
+# numbers, the two resampled columns and temporaries (about 40 bytes per value) within memory_cap.
+def resample(statistic, x, y, kind, n_resamples, memory_cap=2**28, seed=None, workers=1):
+    x, y = np.asarray(x), np.asarray(y)
+    batch = max(1, min(n_resamples, memory_cap // (40*len(x))))
+    counts = [min(batch, n_resamples - start) for start in range(0, n_resamples, batch)]
+    tasks = list(zip(np.random.SeedSequence(seed).spawn(len(counts)), counts))
+    if workers == 1:
+        attach_resampling(statistic, x, y, kind)
+        values = [resample_batch(task) for task in tasks]
+    else:
+        with Pool(workers, attach_resampling, (statistic, x, y, kind)) as pool:
+            values = pool.map(resample_batch, tasks)
+    return np.concatenate(values) if values else np.empty(0)
+
+
+# Bootstrap confidence interval (low, high) of a statistic of two columns
+def bootstrap_interval(statistic, x, y, n_resamples, confidence=0.95, memory_cap=2**28, seed=None, workers=1):
+    values = resample(statistic, x, y, 'bootstrap', n_resamples, memory_cap, seed, workers)
+    values = values[~np.isnan(values)]
+    low, high = np.quantile(values, [(1 - confidence)/2, (1 + confidence)/2])
+    return low, high
+
+
+# Permutation p-value of a statistic of two columns: 'two-sided' counts resamples at least as far from 0
+# as the observed value, 'greater' those at least as large
+def permutation_pvalue(statistic, x, y, n_resamples, alternative='two-sided', memory_cap=2**28, seed=None,
+                       workers=1):
+    x, y = np.asarray(x), np.asarray(y)
+    observed = statistic(x[None], y[None])[0]
+    values = resample(statistic, x, y, 'permutation', n_resamples, memory_cap, seed, workers)
+    if alternative == 'two-sided':
+        observed, values = abs(observed), np.abs(values)
+    # Values equal to the observed one up to rounding count as at least as extreme
+    extreme = np.count_nonzero(values >= observed - 1e-12*abs(observed))
+    return (1 + extreme) / (n_resamples + 1)
+
+
+# Print covariance and correlation matrices labelled with the column names
+def print_matrices(cov, corr, names):
+    print("Covariance Matrix:")
+    print(pd.DataFrame(cov, index=names, columns=names))
+    print("Correlation Matrix:")
+    print(pd.DataFrame(corr, index=names, columns=names))
+
+
+if __name__ == '__main__':
+    if engine == 'rank_benchmark':
+        rank_benchmark(rank_benchmark_sizes, rank_naive_rows)
+        raise SystemExit
+    if engine == 'rank':
+        names = numeric_columns(file_path, columns)
+        table = pd.read_csv(file_path, usecols=names)[names].dropna().to_numpy(dtype=np.float64)
+        spearman, kendall = rank_correlation(table)
+        print("Pearson Correlation Matrix:")
+        print(pd.DataFrame(matrix_correlation(lambda: iter([table]))[1], index=names, columns=names))
+        print("Spearman Correlation Matrix:")
+        print(pd.DataFrame(spearman, index=names, columns=names))
+        print("Kendall Tau-b Matrix:")
+        print(pd.DataFrame(kendall, index=names, columns=names))
+        raise SystemExit
+    if engine in ('stream', 'parallel'):
+        names = numeric_columns(file_path if engine == 'stream' else shards[0], columns)
+        if engine == 'stream':
+            moments = stream_comoments(file_path, names, chunksize, report_every)
+        else:
+            moments = parallel_comoments(shards, names, chunksize, workers)
+        print(f"{moments.count} rows:")
+        print_matrices(moments.covariance(), moments.correlation(), names)
+        raise SystemExit
+
+    if engine == 'matrix':
+        names = numeric_columns(file_path, columns)
+        cov, corr, means, sds, n = matrix_correlation(lambda: read_chunks(file_path, names, chunksize), dtype)
+        print(f"{n} rows:")
+        print_matrices(cov, corr, names)
+        if compare_pandas:
+            df = pd.read_csv(file_path, usecols=names).dropna()
+            print("Largest difference from pandas:")
+            print(f"\tCovariance : {np.abs(cov - df.cov().to_numpy()).max()}")
+            print(f"\tCorrelation : {np.abs(corr - df.corr().to_numpy()).max()}")
+        raise SystemExit
+
+    # Read CSV file into DataFrame
+    df = pd.read_csv(file_path)
+
+    # Convert columns to lists for manual calculation
+    col1 = df['A'].tolist()
+    col2 = df["B"].tolist()
+    cov, corr = list_correlation(col1, col2)
+
+    # Display manual calculation results
+    print("Manually Computed Values:")
+    print(f"\tCovariance : {cov}")
+    print(f"\tCorrelation : {corr}")
+
+    # Compare with pandas built-in functions
+    print("Using Pandas:")
+    print(f"\tCovariance : {df['A'].cov(df['B'])}")
+    print(f"\tCorrelation : {df['A'].corr(df['B'])}")
+
+    # Interpret correlation result
+    # Positive: variables move in same direction
+    # Negative: variables move in opposite directions
+    # Zero: no linear relationship
+    if corr>0:
+        print("Positive Correlation")
+    elif corr<0:
+        print("Negative Correlation")
+    else:
+        print("No Correlation")
+
+    # Uncertainty of the correlation from resampling
+    if n_resamples:
+        x, y = df['A'].to_numpy(dtype=np.float64), df['B'].to_numpy(dtype=np.float64)
+        low, high = bootstrap_interval(pearson_batch, x, y, n_resamples, confidence, batch_memory, seed,
+                                       resample_workers)
+        p_value = permutation_pvalue(pearson_batch, x, y, n_resamples, 'two-sided', batch_memory, seed,
+                                     resample_workers)
+        print(f"Bootstrap {confidence:.0%} interval : [{low}, {high}]")
+        print(f"Permutation p-value : {p_value}")
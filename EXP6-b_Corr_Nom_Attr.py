@@ -33,47 +33,308 @@ If Cramer's V < 0.1: Weak association
 If 0.1 <= Cramer's V < 0.3: Moderate association
 If Cramer's V >= 0.3: Strong association
 
+Significance:
+
+Print the p-value of the Chi-squared test.
+With n_resamples > 0, also resample the rows with the batched resampling engine of EXP6-a: a bootstrap
+confidence interval of Cramer's V (rows drawn with replacement) and a permutation p-value (Preference
+shuffled against Gender; the share of shuffles with a V at least as large as the observed one).
+For a whole batch at once, the contingency table of every resample comes from one bincount of
+resample * rows * columns + row code * columns + column code, and the Chi-squared statistic is computed on
+the stacked tables. As in chi2_contingency, Yates' correction (|O - E| lowered by up to 0.5) is applied when
+the table has one degree of freedom; categories missing from a resample are left out of its table.
+
+Matrix Engine (engine = 'matrix'):
+
+Cramer's V of every pair of nominal columns, as a symmetric association matrix.
+Factorize every column once into integer codes 0..k-1 (missing values become -1), so no pair hashes strings.
+Copy the codes into shared memory and hand blocks of column pairs to a process pool.
+For a pair (x, y) with kx and ky categories, the contingency table is one bincount of x*ky + y over the rows
+where both are present, reshaped to kx x ky; the Chi-squared statistic and V follow as above (with Yates'
+correction when the table has one degree of freedom), leaving out categories that do not occur.
+The diagonal is 1 (NaN for a column with a single category).
+
+Sparse Engine (engine = 'sparse'):
+
+For attributes with 10^5+ categories (SKU, postcode, user agent) the dense table and its expected
+frequencies would be huge and almost all zeros, so only the cells that occur are kept.
+Read the two columns of the file in chunks of chunksize rows. Give every category a number the first time it
+is seen, count the (row number, column number) cells of the chunk and merge them into a table of nonzero
+cells, stored as sorted cell keys (row number * 2^32 + column number) with their counts.
+The row totals r_i and column totals c_j follow from the nonzero cells. Since
+Σ (O - E)^2/E = Σ O^2/E - 2 Σ O + Σ E and E_ij = r_i c_j/n,
+Chi2 = n * (Σ O_ij^2/(r_i c_j) - 1), summed over the nonzero cells only, so the expected frequencies are never
+built. A 2 x 2 table (one degree of freedom) gets Yates' correction as in chi2_contingency, from its four
+cells. Cramer's V = sqrt(Chi2/(n * min(rows-1, columns-1))); the p-value comes from the Chi-squared
+distribution with (rows-1)(columns-1) degrees of freedom.
+
 ---------------------------------------------------------------------------------
 """
 
+import importlib
+from functools import partial
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+
 import pandas as pd
 import numpy as np
+from scipy.stats import chi2 as chi2_distribution
 from scipy.stats import chi2_contingency
 
-# Read CSV file into DataFrame
-df = pd.read_csv('data/Corr_Nom_Attr.csv')
-
-# Create a contingency table
-# Rows: Gender, Columns: Preference
-contingency_table = pd.crosstab(df['Gender'], df['Preference'])
-print("Contingency Table:")
-print(contingency_table)
-
-# Perform Chi-squared test
-# chi2: Chi-squared statistic
-# _: p-value (not used here)
-# _: degrees of freedom (not used here)
-# _: expected frequencies (not used here)
-chi2, _, _, _ = chi2_contingency(contingency_table)
-
-# Calculate total number of observations
-n = contingency_table.sum().sum()
-
-# Calculate Cramer's V statistic
-# Formula: V = sqrt(chi2 / (n * (min(rows-1, columns-1))))
-cramers_v = np.sqrt(chi2 / (n * (min(contingency_table.shape[0] - 1, contingency_table.shape[1] - 1))))
-
-# Print Chi-squared statistic and Cramer's V
-print(f'Chi2: {chi2}')
-print(f'Cramer\'s V: {cramers_v}')
-
-# Interpret Cramer's V value
-# < 0.1: Weak association
-# 0.1 - 0.3: Moderate association
-# > 0.3: Strong association
-if cramers_v < 0.1:
-    print('Weak association')
-elif cramers_v < 0.3:
-    print('Moderate association')
-else:
-    print('Strong association')
\ No newline at end of file
+# The batched resampling engine of EXP6-a (its file name is not a valid module name, so it is imported by name)
+corr_num_attr = importlib.import_module('EXP6-a_Corr_Num_Attr')
+
+# File to read
+file_path = 'Data/Corr_Nom_Attr.csv'
+# Engine used to compute the association:
+#   'pair' - Chi-squared test and Cramer's V of Gender and Preference (steps above)
+#   'matrix' - Cramer's V of every pair of columns on a process pool
+#   'sparse' - Chi-squared test and Cramer's V of two columns from a sparse table read in chunks
+engine = 'pair'
+# Sparse engine: the two columns compared, and number of rows read per chunk
+attributes = ['Gender', 'Preference']
+chunksize = 100000
+# Matrix engine: columns used (None = every column)
+columns = None
+# Matrix engine: number of worker processes (None = all cores) and number of column pairs per task
+workers = None
+pairs_per_task = 64
+# Matrix engine: CSV file the association matrix is written to (None = not written)
+output_path = None
+# Number of bootstrap and permutation resamples of Cramer's V (0 = no resampling)
+n_resamples = 0
+# Confidence level of the bootstrap interval
+confidence = 0.95
+# Largest memory used by one batch of resamples, in bytes
+batch_memory = 2**28
+# Seed of the random generator (None = different resamples on every run)
+seed = 0
+# Worker processes the batches are spread over (1 = this process)
+resample_workers = 1
+
+
+# Chi-squared statistic and Cramer's V of stacked contingency tables (tables x rows x columns)
+def chi2_tables(observed):
+    observed = np.asarray(observed, dtype=np.float64)
+    row_totals, col_totals = observed.sum(axis=2), observed.sum(axis=1)
+    n = row_totals.sum(axis=1)
+    expected = row_totals[:, :, None]*col_totals[:, None, :]/n[:, None, None]
+    # Categories missing from a table do not count towards its degrees of freedom
+    present_rows, present_cols = np.count_nonzero(row_totals, axis=1), np.count_nonzero(col_totals, axis=1)
+    difference = np.abs(observed - expected)
+    # Yates' correction for tables with one degree of freedom, as chi2_contingency does
+    yates = (present_rows - 1)*(present_cols - 1) == 1
+    difference[yates] -= np.minimum(0.5, difference[yates])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        chi2 = np.where(expected > 0, difference**2/expected, 0).sum(axis=(1, 2))
+        return chi2, np.sqrt(chi2 / (n*np.minimum(present_rows - 1, present_cols - 1)))
+
+
+# Cramer's V of every row of two (resamples x n) arrays of category codes
+def cramers_v_batch(x, y):
+    batch, n = x.shape
+    rows, cols = int(x.max()) + 1, int(y.max()) + 1
+    # Contingency table of every resample from one bincount
+    cells = (np.arange(batch)[:, None]*rows + x)*cols + y
+    observed = np.bincount(cells.ravel(), minlength=batch*rows*cols).reshape(batch, rows, cols)
+    return chi2_tables(observed)[1]
+
+
+# Chi-squared statistic and Cramer's V of pairs of columns of the codes held in shared memory
+# (runs in a worker process); returns (i, j, chi2, V) for every pair (i, j)
+def associate_shared_pairs(shm_name, shape, categories, pairs):
+    shm = SharedMemory(name=shm_name)
+    try:
+        codes = np.ndarray(shape, dtype=np.int64, buffer=shm.buf, order='F')
+        results = []
+        for i, j in pairs:
+            x, y = codes[:, i], codes[:, j]
+            # Rows where either value is missing are left out, as in pd.crosstab
+            present = (x >= 0) & (y >= 0)
+            rows, cols = categories[i], categories[j]
+            table = np.bincount(x[present]*cols + y[present], minlength=rows*cols).reshape(1, rows, cols)
+            chi2, v = chi2_tables(table)
+            results.append((i, j, chi2[0], v[0]))
+        return results
+    finally:
+        shm.close()
+
+
+# Cramer's V of every pair of columns of a table as a symmetric matrix, computed on a process pool
+def association_matrix(data, workers=None, pairs_per_task=64):
+    names, shape = list(data.columns), data.shape
+    # Factorize every column once, into a shared block in column-major order
+    shm = SharedMemory(create=True, size=max(data.size, 1) * 8)
+    try:
+        codes = np.ndarray(shape, dtype=np.int64, buffer=shm.buf, order='F')
+        categories = []
+        for j, name in enumerate(names):
+            codes[:, j], uniques = pd.factorize(data[name])
+            categories.append(len(uniques))
+        del codes
+
+        # Workers receive only the block name and their column pairs
+        pairs = [(i, j) for i in range(len(names)) for j in range(i + 1, len(names))]
+        tasks = [pairs[k:k + pairs_per_task] for k in range(0, len(pairs), pairs_per_task)]
+        with Pool(workers) as pool:
+            parts = pool.map(partial(associate_shared_pairs, shm.name, shape, categories), tasks)
+    finally:
+        shm.close()
+        shm.unlink()
+    # A column is fully associated with itself (Yates' correction would lower a 2 x 2 table below 1);
+    # a column with one category has no association
+    matrix = np.diag(np.where(np.array(categories) > 1, 1.0, np.nan))
+    for i, j, chi2, v in (result for part in parts for result in part):
+        matrix[i, j] = matrix[j, i] = v
+    return pd.DataFrame(matrix, index=names, columns=names)
+
+
+# Contingency table of two nominal attributes that keeps only the cells that occur: sorted cell keys
+# (row number * 2^32 + column number) with their counts. Categories are numbered in the order they
+# are first seen; tables built on separate chunks combine with merge().
+class SparseContingency:
+    def __init__(self):
+        self.row_ids, self.column_ids = {}, {}
+        self.keys = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+
+    # Numbers of the values of a chunk, adding the categories not seen before
+    @staticmethod
+    def number(values, ids):
+        codes, uniques = pd.factorize(values)
+        numbers = np.array([ids.setdefault(u, len(ids)) for u in uniques], dtype=np.int64)
+        # Missing values keep the code -1
+        return np.where(codes >= 0, numbers[codes] if len(numbers) else -1, -1)
+
+    def update(self, x, y):
+        # Rows where either value is missing are left out, as in pd.crosstab, before numbering, so a
+        # category seen only next to a missing value is not a row or column of the table
+        x, y = np.asarray(x, dtype=object), np.asarray(y, dtype=object)
+        present = pd.notna(x) & pd.notna(y)
+        rows, cols = self.number(x[present], self.row_ids), self.number(y[present], self.column_ids)
+        keys, counts = np.unique((rows << 32) | cols, return_counts=True)
+        self.add(keys, counts)
+        return self
+
+    # Add cells (sorted keys with counts) to the table
+    def add(self, keys, counts):
+        keys, inverse = np.unique(np.concatenate([self.keys, keys]), return_inverse=True)
+        self.counts = np.bincount(inverse, weights=np.concatenate([self.counts, counts]),
+                                  minlength=len(keys)).astype(np.int64)
+        self.keys = keys
+
+    def merge(self, other):
+        # Renumber the categories of the other table into this one
+        row_map = np.array([self.row_ids.setdefault(u, len(self.row_ids)) for u in other.row_ids], dtype=np.int64)
+        col_map = np.array([self.column_ids.setdefault(u, len(self.column_ids)) for u in other.column_ids],
+                           dtype=np.int64)
+        if len(other.keys):
+            keys = (row_map[other.keys >> 32] << 32) | col_map[other.keys & 0xFFFFFFFF]
+            order = np.argsort(keys)
+            self.add(keys[order], other.counts[order])
+        return self
+
+    # Number of observations, row totals and column totals
+    def totals(self):
+        rows, cols = self.keys >> 32, self.keys & 0xFFFFFFFF
+        row_totals = np.bincount(rows, weights=self.counts, minlength=len(self.row_ids))
+        col_totals = np.bincount(cols, weights=self.counts, minlength=len(self.column_ids))
+        return int(self.counts.sum()), row_totals, col_totals
+
+    # Chi-squared statistic, degrees of freedom and Cramer's V from the nonzero cells and the totals
+    def chi2(self):
+        n, row_totals, col_totals = self.totals()
+        r, c = len(self.row_ids), len(self.column_ids)
+        if r == 2 and c == 2:
+            # One degree of freedom: Yates' correction on the four cells, as in chi2_contingency
+            table = np.zeros((1, 2, 2))
+            table[0, self.keys >> 32, self.keys & 0xFFFFFFFF] = self.counts
+            chi2, v = chi2_tables(table)
+            return chi2[0], 1, v[0]
+        rows, cols = self.keys >> 32, self.keys & 0xFFFFFFFF
+        counts = self.counts.astype(np.float64)
+        chi2 = n*(np.sum(counts**2/(row_totals[rows]*col_totals[cols])) - 1)
+        # Rounding can leave a tiny negative value for independent attributes
+        chi2 = max(chi2, 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            v = np.sqrt(chi2 / (n*min(r - 1, c - 1))) if min(r, c) > 1 else np.nan
+        return chi2, (r - 1)*(c - 1), v
+
+
+# Build the sparse contingency table of two columns of a file, reading it in chunks
+def sparse_contingency(file_path, attributes, chunksize):
+    table = SparseContingency()
+    for chunk in pd.read_csv(file_path, usecols=attributes, dtype=str, chunksize=chunksize):
+        table.update(chunk[attributes[0]], chunk[attributes[1]])
+    return table
+
+
+if __name__ == '__main__':
+    if engine == 'sparse':
+        table = sparse_contingency(file_path, attributes, chunksize)
+        n, _, _ = table.totals()
+        chi2, dof, cramers_v = table.chi2()
+        print(f"{attributes[0]} x {attributes[1]}: {n} observations, {len(table.row_ids)} x "
+              f"{len(table.column_ids)} categories, {len(table.keys)} nonzero cells")
+        print(f'Chi2: {chi2}')
+        print(f'Cramer\'s V: {cramers_v}')
+        print(f'p-value: {chi2_distribution.sf(chi2, dof) if dof else 1.0}')
+        raise SystemExit
+
+    if engine == 'matrix':
+        data = pd.read_csv(file_path, usecols=columns, dtype=str)
+        matrix = association_matrix(data, workers, pairs_per_task)
+        print("Cramer's V Matrix:")
+        print(matrix)
+        if output_path is not None:
+            matrix.to_csv(output_path)
+        raise SystemExit
+
+    # Read CSV file into DataFrame
+    df = pd.read_csv(file_path)
+
+    # Create a contingency table
+    # Rows: Gender, Columns: Preference
+    contingency_table = pd.crosstab(df['Gender'], df['Preference'])
+    print("Contingency Table:")
+    print(contingency_table)
+
+    # Perform Chi-squared test
+    # chi2: Chi-squared statistic
+    # p_value: probability of a Chi-squared statistic this large without association
+    # _: degrees of freedom (not used here)
+    # _: expected frequencies (not used here)
+    chi2, p_value, _, _ = chi2_contingency(contingency_table)
+
+    # Calculate total number of observations
+    n = contingency_table.sum().sum()
+
+    # Calculate Cramer's V statistic
+    # Formula: V = sqrt(chi2 / (n * (min(rows-1, columns-1))))
+    cramers_v = np.sqrt(chi2 / (n * (min(contingency_table.shape[0] - 1, contingency_table.shape[1] - 1))))
+
+    # Print Chi-squared statistic and Cramer's V
+    print(f'Chi2: {chi2}')
+    print(f'Cramer\'s V: {cramers_v}')
+    print(f'p-value: {p_value}')
+
+    # Interpret Cramer's V value
+    # < 0.1: Weak association
+    # 0.1 - 0.3: Moderate association
+    # > 0.3: Strong association
+    if cramers_v < 0.1:
+        print('Weak association')
+    elif cramers_v < 0.3:
+        print('Moderate association')
+    else:
+        print('Strong association')
+
+    # Uncertainty of Cramer's V from resampling
+    if n_resamples:
+        x, y = pd.factorize(df['Gender'])[0], pd.factorize(df['Preference'])[0]
+        low, high = corr_num_attr.bootstrap_interval(cramers_v_batch, x, y, n_resamples, confidence, batch_memory,
+                                                     seed, resample_workers)
+        permutation_p = corr_num_attr.permutation_pvalue(cramers_v_batch, x, y, n_resamples, 'greater',
+                                                         batch_memory, seed, resample_workers)
+        print(f'Bootstrap {confidence:.0%} interval: [{low}, {high}]')
+        print(f'Permutation p-value: {permutation_p}')
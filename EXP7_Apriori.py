@@ -7,17 +7,17 @@ Minimum confidence threshold (min_conf)
 Steps:
 Load Dataset
 
-Read the dataset from a CSV file into a pandas DataFrame
-Convert the DataFrame into a list of transactions
+Read the dataset from a file into a transaction store (see below): every item gets a number in sorted order,
+and every transaction is the sorted item numbers of its basket, so every itemset is a sorted tuple of item numbers
 Generate 1-itemsets
 
-Extract unique items from all transactions
+Count every item in one pass over the item numbers of the store
 Create initial candidate itemsets with single items
 Filter Candidates by Support
 
 For each candidate itemset:
-Count the number of transactions containing the candidate itemset
-If the count meets or exceeds the minimum support, add the candidate to the list of frequent itemsets
+If its count meets or exceeds the minimum support, add the candidate to the list of frequent itemsets
+and record its count in the support table (itemset -> count)
 Store All Frequent Itemsets
 
 Copy the list of frequent itemsets to a new list to store all frequent itemsets
@@ -25,10 +25,17 @@ Generate Higher-order Itemsets
 
 Initialize k to 2 (for 2-itemsets)
 While there are frequent itemsets of length k-1:
-Generate candidate itemsets by taking the union of pairs of frequent itemsets of length k-1
-Only consider itemsets of length k
-Filter candidates by support as in step 3
+Join: sort the frequent (k-1)-itemsets; two of them that share their first k-2 items (next to each other
+after sorting) give the candidate prefix + both last items. Every candidate is generated once.
+Prune: a candidate with a (k-1)-subset that is not frequent cannot be frequent; drop it before counting.
+Count: put the candidates in a trie (one level per item). For each transaction, walk the trie along its sorted
+items and add 1 to every candidate reached at depth k; only the candidates contained in the transaction are
+visited. Items not in any frequent (k-1)-itemset are removed from the transactions first, and transactions
+with fewer than k items are skipped.
+Keep the candidates whose count meets or exceeds the minimum support
 Add the new frequent itemsets to the list of all frequent itemsets
+Record the candidates generated, pruned and counted and the itemsets found at level k (printed with
+report_levels = True)
 Increment k by 1
 Display Frequent Itemsets
 
@@ -36,14 +43,17 @@ Print all frequent itemsets
 Generate and Display Association Rules
 
 For each frequent itemset with more than one item:
-Generate all possible subsets of the itemset
-For each subset (antecedent):
-The consequent is the itemset minus the antecedent
-Only consider non-empty consequents
-Calculate support for the itemset
-Calculate support for the antecedent
+Every subset of a frequent itemset is frequent, so the supports of the itemset and of every antecedent are
+looked up in the support table instead of counted again; rule generation does not read the transactions
+Start with the consequents of one item
+For each consequent:
+The antecedent is the itemset minus the consequent
 Calculate confidence as the ratio of itemset support to antecedent support
 If the confidence meets or exceeds the minimum confidence, print the rule
+Moving an item from the antecedent to the consequent can only lower the confidence (the antecedent's support
+can only grow), so the consequents one item larger are built only from consequents that passed, and only
+if all of their subsets passed
+Stop when the antecedent would be empty
 
 Output:
 Frequent itemsets that meet the minimum support threshold
@@ -55,78 +65,638 @@ Output: Frequent itemsets and association rules
 
 Notes:
 Adjust min_sup and min_conf based on your dataset and requirements.
-Ensure the dataset is in the correct format (transactions in rows, items in columns).
+Ensure the dataset is in the format set by transaction_format.
+
+Transaction Store:
+
+Baskets of any size are stored in CSR form, as in sparse matrices: item_ids holds the item numbers of all the
+baskets one after the other (sorted and without repeats inside a basket), and basket t is
+item_ids[offsets[t]:offsets[t+1]]; items maps an item number back to the item. Memory is 4 bytes per item
+of a basket plus 8 per basket, instead of a Python list of strings per basket.
+The file can hold:
+  'rows' - a CSV file with a header and one basket per row, one item per column; empty cells are left out, so
+           rows can be shorter than the header
+  'baskets' - one basket per line, items separated by commas, no header; lines can have any length
+  'long' - a CSV file with a header and one (transaction id, item) pair per row, in its first two columns
+Parsing: the items of all the baskets are numbered at once (pd.factorize), then the pairs
+(basket, item number) are sorted and deduplicated with np.unique on basket * n_items + item number, and the
+offsets are the cumulative sizes of the baskets.
+Cache: with cache_transactions = True the store is saved next to the file (file_path + '.<format>.npz') and
+loaded from there while it is newer than the file, so a repeat run skips parsing.
+Every engine mines the store.
+
+FP-Growth Engine (engine = 'fpgrowth'):
+
+Finds the same frequent itemsets without generating candidates, in two passes over the transactions.
+First pass: count every item and keep the frequent ones (count >= min_sup).
+Second pass: insert every transaction into an FP-tree (a prefix tree) with its frequent items ordered by
+decreasing count, so transactions sharing their most frequent items share a path; every node holds the number
+of transactions through it, and a header table links the nodes of each item.
+Mining: for each item of the tree, from the least frequent up, the itemset suffix + item is frequent with the
+total count of the item's nodes. The paths from its nodes up to the root, each weighted by the node's count,
+form its conditional pattern base; build an FP-tree of that base and mine it recursively with the longer suffix.
+Rules are generated as above from the counts found while mining.
+
+Eclat Engine (engine = 'eclat'):
+
+Store the transactions vertically (built from the store with no loop over the baskets): for every item, a bitset of the transactions that contain it, packed
+64 transactions to a uint64 word (n/8 bytes per item, so memory is known in advance).
+The support of an itemset is the number of set bits (popcount) of the AND of its items' bitsets.
+Search depth-first: the bitset of an itemset is kept and ANDed with the bitset of each item that can extend it,
+so a k-itemset costs one AND of its (k-1)-itemset's bitset instead of a scan of the transactions. All the
+extensions of an itemset are counted at once on the stacked bitsets of the items; those with
+count >= min_sup are extended further. Items are visited from the least frequent up, which keeps the
+bitsets sparse and the extension lists short.
+
+Partitioned Engine (engine = 'son'), for transaction files larger than memory (SON algorithm):
+
+Count the L lines of the file (newline bytes, without parsing), then read it in chunks of chunksize transactions,
+each a transaction store (with 'long' files chunksize counts rows, and the rows of a transaction must be next
+to each other).
+Pass 1: mine every chunk on its own on a process pool, with the support scaled to its size:
+min_sup * l_i / L for a chunk read from l_i lines. An itemset that is frequent in the whole file is frequent
+in at least one chunk at this support (otherwise its counts would add up to less than min_sup, since the l_i
+add up to at most L), so the union of the local frequent itemsets holds every frequent itemset (and some false
+positives). The number of transactions is counted during this pass.
+Pass 2: read the file again and count the candidates of the union in every chunk on the process pool, with
+a trie per itemset size as in Apriori; the itemsets whose total count meets min_sup are frequent.
+Only `workers` chunks are in memory at a time.
+
+Benchmark (engine = 'benchmark'): time Apriori against FP-Growth and Eclat on synthetic baskets of each size in
+benchmark_sizes.
 -------------------------------------------------------------------------------
 """
 
+import os
+import time
+from collections import Counter, defaultdict
+from multiprocessing import Pool
+
+import numpy as np
 import pandas as pd
 from itertools import combinations
 
+# File to read
+file_path = 'Data/Apriori.csv'
+# Layout of the file: 'rows', 'baskets' or 'long' (see Transaction Store above)
+transaction_format = 'rows'
+# Save the parsed transactions next to the file and load them from there on the next run
+cache_transactions = True
+# Engine used to find the frequent itemsets:
+#   'apriori' - candidates generated level by level (steps above)
+#   'fpgrowth' - FP-Growth on an FP-tree
+#   'eclat' - depth-first search with a bitset of transactions per item
+#   'son' - partitioned (SON) mining of a file in chunks on a process pool
+#   'benchmark' - time Apriori against FP-Growth and Eclat on synthetic baskets
+engine = 'apriori'
 # Set minimum support and confidence thresholds
 min_sup = 3
 min_conf = 0.6
+# Print the candidates generated, pruned and counted at every level of Apriori
+report_levels = True
+# Partitioned engine: number of transactions per chunk, and number of worker processes (None = all cores)
+chunksize = 100000
+workers = None
+# Benchmark: numbers of transactions generated, number of distinct items, and minimum support as a
+# share of the transactions
+benchmark_sizes = [10**5, 10**6]
+benchmark_items = 1000
+benchmark_support = 0.01
+
+
+# Baskets in CSR form: the item numbers of basket t are item_ids[offsets[t]:offsets[t+1]], sorted, and
+# items[number] is the item with that number (items are numbered in sorted order)
+class TransactionStore:
+    def __init__(self, items, offsets, item_ids):
+        self.items = items
+        self.offsets = offsets
+        self.item_ids = item_ids
+
+    # Store of (basket, item) pairs: tids are basket numbers (0..n_baskets-1), values the items
+    @classmethod
+    def from_pairs(cls, tids, values, n_baskets):
+        codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+        # Renumber the items in sorted order
+        order = np.array(sorted(range(len(uniques)), key=lambda code: str(uniques[code])), dtype=np.int64)
+        rank = np.empty(len(uniques), dtype=np.int64)
+        rank[order] = np.arange(len(uniques))
+        n_items = max(len(uniques), 1)
+        # Sort by basket then item, dropping an item repeated in a basket
+        keys = np.unique(np.asarray(tids, dtype=np.int64) * n_items + rank[codes])
+        sizes = np.bincount(keys // n_items, minlength=n_baskets)
+        offsets = np.zeros(n_baskets + 1, dtype=np.int64)
+        np.cumsum(sizes, out=offsets[1:])
+        return cls([uniques[code] for code in order], offsets, (keys % n_items).astype(np.int32))
+
+    # Store of a DataFrame with one basket per row, leaving out the empty cells
+    @classmethod
+    def from_frame(cls, df):
+        values = df.values
+        present = pd.notna(values)
+        tids, _ = np.nonzero(present)
+        return cls.from_pairs(tids, values[present], len(df))
+
+    # Store of a list of baskets (iterables of items)
+    @classmethod
+    def from_baskets(cls, baskets):
+        sizes = [len(basket) for basket in baskets]
+        values = [item for basket in baskets for item in basket]
+        return cls.from_pairs(np.repeat(np.arange(len(baskets)), sizes), values, len(baskets))
+
+    # Store of a long DataFrame: transaction ids in the first column, items in the second
+    @classmethod
+    def from_long(cls, df):
+        df = df.iloc[:, :2].dropna()
+        tids, uniques = pd.factorize(df.iloc[:, 0])
+        return cls.from_pairs(tids, df.iloc[:, 1].values, len(uniques))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    # Item numbers of every basket, as tuples
+    def baskets(self):
+        item_ids = self.item_ids.tolist()
+        offsets = self.offsets.tolist()
+        return [tuple(item_ids[offsets[t]:offsets[t + 1]]) for t in range(len(self))]
+
+    # Basket number of every entry of item_ids
+    def tids(self):
+        return np.repeat(np.arange(len(self)), np.diff(self.offsets))
+
+    # Number of baskets containing every item
+    def item_counts(self):
+        return np.bincount(self.item_ids, minlength=len(self.items))
+
+    # Itemset of items from a collection of item numbers
+    def decode(self, numbers):
+        return frozenset(self.items[number] for number in numbers)
+
+    def save(self, path):
+        np.savez(path, items=np.array(self.items, dtype=str), offsets=self.offsets, item_ids=self.item_ids)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['items'].tolist(), data['offsets'], data['item_ids'])
 
-# Load dataset
-df = pd.read_csv('Data/Apriori.csv')
-transactions = df.values.tolist()
-
-# Step 1: Generate 1-itemsets
-items = set(item for transaction in transactions for item in transaction)
-candidates = [{item} for item in items]
-
-# Step 2: Filter candidates by support
-frequent_itemsets = []
-for candidate in candidates:
-    count = sum(1 for transaction in transactions if candidate.issubset(transaction))
-    if count >= min_sup:
-        frequent_itemsets.append(candidate)
-
-# Store all frequent itemsets
-all_frequent_itemsets = frequent_itemsets.copy()
-k = 2
-
-# Step 3: Generate higher-order itemsets
-while frequent_itemsets:
-    candidates = []
-    n = len(frequent_itemsets)
-    for i in range(n):
-        for j in range(i + 1, n):
-            candidate = frequent_itemsets[i].union(frequent_itemsets[j])
-            if len(candidate) == k:
-                candidates.append(candidate)
-    
+
+# Store of a file in the given layout ('rows', 'baskets' or 'long')
+def parse_transactions(file_path, transaction_format):
+    if transaction_format == 'rows':
+        return TransactionStore.from_frame(pd.read_csv(file_path, dtype=str))
+    if transaction_format == 'long':
+        return TransactionStore.from_long(pd.read_csv(file_path, dtype=str))
+    if transaction_format == 'baskets':
+        with open(file_path) as f:
+            return TransactionStore.from_baskets(basket_lines(f))
+    raise ValueError(f"Unknown transaction format: {transaction_format}")
+
+
+# Baskets of lines with comma-separated items, skipping blank lines
+def basket_lines(lines):
+    baskets = []
+    for line in lines:
+        basket = [item.strip() for item in line.split(',') if item.strip()]
+        if basket:
+            baskets.append(basket)
+    return baskets
+
+
+# Load dataset: the store of the file, from its cache when the cache is newer than the file
+def load_transactions(file_path, transaction_format='rows', cache=True):
+    cache_path = f"{file_path}.{transaction_format}.npz"
+    if cache and os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(file_path):
+        return TransactionStore.load(cache_path)
+    store = parse_transactions(file_path, transaction_format)
+    if cache:
+        store.save(cache_path)
+    return store
+
+
+# Count the candidates (sorted tuples of item numbers, all of length k) contained in the transactions
+# (sorted tuples of item numbers) with a trie of the candidates
+def count_candidates(candidates, transactions, k):
+    trie = {}
+    for index, candidate in enumerate(candidates):
+        node = trie
+        for item in candidate[:-1]:
+            node = node.setdefault(item, {})
+        # The last level holds the number of the candidate
+        node[candidate[-1]] = index
+    counts = [0] * len(candidates)
+
+    # Follow the items of a transaction from position start through the trie, at depth `depth`
+    def walk(node, transaction, start, depth):
+        # Leave enough items after position i to reach depth k
+        for i in range(start, len(transaction) - (k - depth) + 1):
+            child = node.get(transaction[i])
+            if child is not None:
+                if depth == k - 1:
+                    counts[child] += 1
+                else:
+                    walk(child, transaction, i + 1, depth + 1)
+
+    for transaction in transactions:
+        walk(trie, transaction, 0, 0)
+    return counts
+
+
+# Frequent itemsets of a transaction store, generating candidates level by level.
+# Returns them with the support table (itemset -> count) and the statistics of every level.
+def apriori(store, min_sup):
+    support_counts = {}
+    levels = []
+
+    # Step 1: Generate 1-itemsets; the store numbers the items in sorted order
+    items = store.items
+    item_counts = store.item_counts().tolist()
+    transactions = store.baskets()
+
+    # Step 2: Filter candidates by support
     frequent_itemsets = []
+    for number, item in enumerate(items):
+        if item_counts[number] >= min_sup:
+            frequent_itemsets.append((number,))
+            support_counts[frozenset([item])] = item_counts[number]
+    levels.append({'k': 1, 'generated': len(items), 'pruned': 0, 'counted': len(items),
+                   'transactions': len(transactions), 'frequent': len(frequent_itemsets)})
+
+    # Store all frequent itemsets
+    all_frequent_itemsets = frequent_itemsets.copy()
+    k = 2
+
+    # Step 3: Generate higher-order itemsets
+    while frequent_itemsets:
+        # Join itemsets with the same first k-2 items, which are next to each other once sorted
+        frequent_itemsets.sort()
+        frequent = set(frequent_itemsets)
+        candidates, generated, start = [], 0, 0
+        for end in range(1, len(frequent_itemsets) + 1):
+            if end < len(frequent_itemsets) and frequent_itemsets[end][:-1] == frequent_itemsets[start][:-1]:
+                continue
+            for i in range(start, end):
+                for j in range(i + 1, end):
+                    candidate = frequent_itemsets[i] + frequent_itemsets[j][-1:]
+                    generated += 1
+                    # Prune: the subsets without one of the first k-2 items must be frequent too
+                    # (the two without one of the last items are the itemsets joined)
+                    if all(candidate[:m] + candidate[m + 1:] in frequent for m in range(k - 2)):
+                        candidates.append(candidate)
+            start = end
+
+        # Only items of frequent (k-1)-itemsets can be part of a frequent k-itemset
+        useful = {item for itemset in frequent_itemsets for item in itemset}
+        transactions = [transaction for transaction in
+                        (tuple(item for item in transaction if item in useful) for transaction in transactions)
+                        if len(transaction) >= k]
+        counts = count_candidates(candidates, transactions, k) if candidates else []
+
+        frequent_itemsets = []
+        for candidate, count in zip(candidates, counts):
+            if count >= min_sup:
+                frequent_itemsets.append(candidate)
+                support_counts[frozenset(items[number] for number in candidate)] = count
+        levels.append({'k': k, 'generated': generated, 'pruned': generated - len(candidates),
+                       'counted': len(candidates), 'transactions': len(transactions),
+                       'frequent': len(frequent_itemsets)})
+
+        all_frequent_itemsets.extend(frequent_itemsets)
+        k += 1
+    return [{items[number] for number in itemset} for itemset in all_frequent_itemsets], support_counts, levels
+
+
+# Node of an FP-tree: an item, the number of transactions through the node, and its links
+class FPNode:
+    def __init__(self, item, parent):
+        self.item, self.parent = item, parent
+        self.count = 0
+        self.children = {}
+
+
+# Build an FP-tree from weighted paths (items, count): one pass to count the items, one to insert the
+# paths with their frequent items in decreasing order of count. Returns the header table
+# (item -> its nodes) and the counts of the frequent items.
+def build_fp_tree(paths, min_sup):
+    counts = Counter()
+    for items, count in paths:
+        for item in items:
+            counts[item] += count
+    frequent = {item: count for item, count in counts.items() if count >= min_sup}
+    # Ties are broken by the item, so the tree does not depend on the order of the transactions
+    rank = {item: r for r, item in enumerate(sorted(frequent, key=lambda item: (-frequent[item], item)))}
+
+    root = FPNode(None, None)
+    header = defaultdict(list)
+    for items, count in paths:
+        node = root
+        for item in sorted((item for item in items if item in rank), key=rank.get):
+            child = node.children.get(item)
+            if child is None:
+                child = node.children[item] = FPNode(item, node)
+                header[item].append(child)
+            child.count += count
+            node = child
+    return header, frequent, rank
+
+
+# Add the frequent itemsets that end with suffix, mined from weighted paths, to counts (itemset -> count)
+def mine_fp_tree(paths, min_sup, suffix, counts):
+    header, frequent, rank = build_fp_tree(paths, min_sup)
+    # From the least frequent item up
+    for item in sorted(frequent, key=rank.get, reverse=True):
+        itemset = suffix | {item}
+        counts[itemset] = frequent[item]
+        # Conditional pattern base: the path above every node of the item, weighted by the node's count
+        base = []
+        for node in header[item]:
+            path, parent = [], node.parent
+            while parent.item is not None:
+                path.append(parent.item)
+                parent = parent.parent
+            if path:
+                base.append((path, node.count))
+        if base:
+            mine_fp_tree(base, min_sup, itemset, counts)
+
+
+# Frequent itemsets of a transaction store with FP-Growth, as a dictionary itemset -> count
+def fp_growth(store, min_sup):
+    counts = {}
+    # The tree is built on item numbers
+    mine_fp_tree([(basket, 1) for basket in store.baskets()], min_sup, frozenset(), counts)
+    return {store.decode(itemset): count for itemset, count in counts.items()}
+
+
+# Association rules (antecedent, consequent, support, confidence) of the frequent itemsets (all of
+# counts by default), from the support table alone. For each itemset the consequents grow one item
+# at a time from those that reached min_conf, since a larger consequent cannot have a higher confidence.
+def rules_from_counts(counts, n_transactions, min_conf, itemsets=None):
+    rules = []
+    # Each itemset once, in the order given
+    for itemset in dict.fromkeys(map(frozenset, counts if itemsets is None else itemsets)):
+        if len(itemset) < 2:
+            continue
+        support = counts[itemset] / n_transactions
+        found = []
+        consequents = [frozenset([item]) for item in sorted(itemset, key=str)]
+        size = 1
+        while consequents and size < len(itemset):
+            passed = []
+            for consequent in consequents:
+                antecedent = itemset - consequent
+                antecedent_support = counts[antecedent] / n_transactions
+                confidence = support / antecedent_support
+                if confidence >= min_conf:
+                    found.append((antecedent, consequent, support, confidence))
+                    passed.append(consequent)
+            # Consequents one item larger whose subsets all passed
+            passed_set = set(passed)
+            larger = {}
+            for a, b in combinations(passed, 2):
+                union = a | b
+                if len(union) == size + 1 and all(union - {item} in passed_set for item in union):
+                    larger[union] = None
+            consequents = list(larger)
+            size += 1
+        # Smaller antecedents first
+        rules += sorted(found, key=lambda rule: len(rule[0]))
+    return rules
+
+
+# Number of set bits of every uint64 word (np.bitwise_count needs NumPy 2.0; older versions use a byte table)
+if hasattr(np, 'bitwise_count'):
+    popcount = np.bitwise_count
+else:
+    byte_bits = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.uint8)
+
+    def popcount(words):
+        words = np.ascontiguousarray(words)
+        return byte_bits[words.view(np.uint8)].reshape(words.shape + (8,)).sum(axis=-1)
+
+
+# Vertical bitsets of a transaction store: an (items x words) uint64 array whose row i has bit t set
+# when transaction t contains item number i
+def item_bitsets(store):
+    tids, item_ids = store.tids(), store.item_ids.astype(np.int64)
+    words = (len(store) + 63) // 64
+    bitsets = np.zeros((len(store.items), words), dtype=np.uint64)
+    if len(tids):
+        # OR together the bits that fall into the same word of the same item
+        cells = item_ids * words + (tids >> 6)
+        order = np.argsort(cells, kind='stable')
+        cells, bits = cells[order], np.left_shift(np.uint64(1), (tids[order] & 63).astype(np.uint64))
+        starts = np.flatnonzero(np.r_[True, cells[1:] != cells[:-1]])
+        bitsets.reshape(-1)[cells[starts]] = np.bitwise_or.reduceat(bits, starts)
+    return bitsets
+
+
+# Add the frequent extensions of prefix to counts. items, bitsets and supports are the items that can
+# extend the prefix, the bitsets of prefix + item, and their counts.
+def mine_bitsets(prefix, items, bitsets, supports, min_sup, counts):
+    for i, item in enumerate(items):
+        itemset = prefix | {item}
+        counts[itemset] = int(supports[i])
+        if i + 1 < len(items):
+            # Count every extension of the itemset at once
+            extended = bitsets[i + 1:] & bitsets[i]
+            extended_supports = popcount(extended).sum(axis=1)
+            keep = np.flatnonzero(extended_supports >= min_sup)
+            if len(keep):
+                mine_bitsets(itemset, [items[i + 1 + k] for k in keep], extended[keep], extended_supports[keep],
+                             min_sup, counts)
+
+
+# Frequent itemsets of a transaction store with Eclat on bitsets, as a dictionary itemset -> count
+def eclat(store, min_sup):
+    bitsets = item_bitsets(store)
+    supports = popcount(bitsets).sum(axis=1)
+    # Frequent items from the least frequent up
+    order = np.array([i for i in np.argsort(supports, kind='stable') if supports[i] >= min_sup], dtype=np.int64)
+    counts = {}
+    mine_bitsets(frozenset(), [store.items[i] for i in order], bitsets[order], supports[order], min_sup, counts)
+    return counts
+
+
+# Number of lines of a file, counting newline bytes block by block without parsing
+def count_lines(file_path, block_size=2**20):
+    lines, last = 0, b'\n'
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            lines += block.count(b'\n')
+            last = block[-1:]
+    # A last line without a newline
+    return lines + (last != b'\n')
+
+
+# Transaction stores of a file in chunks of chunksize transactions, each with the number of lines it was
+# read from. In a 'long' file the rows of the last transaction of a chunk are kept for the next chunk,
+# since more of them may follow.
+def read_transaction_chunks(file_path, chunksize, transaction_format='rows'):
+    if transaction_format == 'rows':
+        for chunk in pd.read_csv(file_path, dtype=str, chunksize=chunksize):
+            yield TransactionStore.from_frame(chunk), len(chunk)
+    elif transaction_format == 'baskets':
+        with open(file_path) as f:
+            for batch in batches(f, chunksize):
+                baskets = basket_lines(batch)
+                if baskets:
+                    yield TransactionStore.from_baskets(baskets), len(batch)
+    elif transaction_format == 'long':
+        rest = None
+        for chunk in pd.read_csv(file_path, dtype=str, chunksize=chunksize):
+            chunk = chunk.iloc[:, :2].dropna()
+            if rest is not None:
+                chunk = pd.concat([rest, chunk])
+            last = chunk.iloc[:, 0] == chunk.iloc[-1, 0] if len(chunk) else np.zeros(0, dtype=bool)
+            rest = chunk[last]
+            if not last.all():
+                yield TransactionStore.from_long(chunk[~last]), int((~last).sum())
+        if rest is not None and len(rest):
+            yield TransactionStore.from_long(rest), len(rest)
+    else:
+        raise ValueError(f"Unknown transaction format: {transaction_format}")
+
+
+# Lists of up to `size` consecutive elements of an iterator
+def batches(iterable, size):
+    batch = []
+    for element in iterable:
+        batch.append(element)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# Frequent itemsets of one chunk at its scaled support (runs in a worker process)
+def mine_partition(task):
+    store, local_min_sup = task
+    return set(eclat(store, local_min_sup))
+
+
+# Candidates counted by a worker process, set once by attach_candidates
+worker_state = {}
+
+
+# Give a worker process the item numbers and the candidates (itemset size -> sorted tuples of item numbers)
+def attach_candidates(numbers, candidates):
+    worker_state['numbers'], worker_state['candidates'] = numbers, candidates
+
+
+# Counts of the candidates in one chunk, per itemset size (runs in a worker process)
+def count_partition(store):
+    numbers, candidates = worker_state['numbers'], worker_state['candidates']
+    # Renumber the items of the chunk as in the candidates; only the items of some candidate matter
+    renumber = np.array([numbers.get(item, -1) for item in store.items], dtype=np.int64)
+    ids = renumber[store.item_ids]
+    keep = ids >= 0
+    tids = store.tids()[keep]
+    order = np.lexsort((ids[keep], tids))
+    ids, tids = ids[keep][order].tolist(), tids[order]
+    bounds = np.searchsorted(tids, np.arange(len(store) + 1)).tolist()
+    transactions = [tuple(ids[bounds[t]:bounds[t + 1]]) for t in range(len(store))]
+    return {k: count_candidates(level, [transaction for transaction in transactions if len(transaction) >= k], k)
+            for k, level in candidates.items()}
+
+
+# Frequent itemsets of a transaction file with the SON algorithm: local mining of every chunk at a
+# scaled support, then one more pass counting the union of the local itemsets. Returns the counts
+# (itemset -> count) and the statistics of the run.
+def son(file_path, min_sup, chunksize, workers=None, transaction_format='rows'):
+    workers = workers or os.cpu_count()
+    lines = max(count_lines(file_path), 1)
+
+    # Pass 1: local frequent itemsets; count >= min_sup * l_i / L is count >= ceil(min_sup * l_i / L)
+    candidates, partitions, total = set(), 0, 0
+    with Pool(workers) as pool:
+        for batch in batches(read_transaction_chunks(file_path, chunksize, transaction_format), workers):
+            tasks = [(chunk, max(1, -(-min_sup * chunk_lines // lines))) for chunk, chunk_lines in batch]
+            for local in pool.map(mine_partition, tasks):
+                candidates |= local
+            partitions += len(batch)
+            total += sum(len(chunk) for chunk, _ in batch)
+
+    # Pass 2: count the candidates in every chunk and add up the counts
+    items = sorted({item for candidate in candidates for item in candidate}, key=str)
+    numbers = {item: number for number, item in enumerate(items)}
+    by_size = defaultdict(list)
     for candidate in candidates:
-        count = sum(1 for transaction in transactions if candidate.issubset(transaction))
-        if count >= min_sup:
-            frequent_itemsets.append(candidate)
-    
-    all_frequent_itemsets.extend(frequent_itemsets)
-    k += 1
-
-# Display frequent itemsets
-print("Frequent Itemsets:")
-for itemset in all_frequent_itemsets:
-    print(itemset)
-
-# Step 4: Generate and display association rules
-print("\nAssociation Rules:")
-for itemset in all_frequent_itemsets:
-    if len(itemset) > 1:
-        # Generate all possible combinations of items for antecedents
-        for r in range(1, len(itemset)):
-            for antecedent in combinations(itemset, r):
-                antecedent = frozenset(antecedent)
-                consequent = itemset - antecedent
-                
-                if consequent:
-                    itemset_support_count = sum(1 for transaction in transactions if itemset.issubset(transaction))
-                    support = itemset_support_count / len(transactions)
-                    
-                    antecedent_support_count = sum(1 for transaction in transactions if antecedent.issubset(transaction))
-                    antecedent_support = antecedent_support_count / len(transactions)
-                    
-                    confidence = support / antecedent_support
-                    
-                    if confidence >= min_conf:
-                        print(f"{set(antecedent)} -> {set(consequent)} (support: {support}, confidence: {confidence})")
+        by_size[len(candidate)].append(tuple(sorted(numbers[item] for item in candidate)))
+    totals = {k: np.zeros(len(level), dtype=np.int64) for k, level in by_size.items()}
+    with Pool(workers, attach_candidates, (numbers, dict(by_size))) as pool:
+        for batch in batches(read_transaction_chunks(file_path, chunksize, transaction_format), workers):
+            for part in pool.map(count_partition, [chunk for chunk, _ in batch]):
+                for k, counts in part.items():
+                    totals[k] += counts
+
+    counts = {frozenset(items[number] for number in candidate): int(count)
+              for k, level in by_size.items() for candidate, count in zip(level, totals[k]) if count >= min_sup}
+    return counts, {'transactions': total, 'partitions': partitions, 'candidates': len(candidates),
+                    'frequent': len(counts)}
+
+
+# Synthetic baskets: item popularity follows a Zipf-like law and basket sizes a Poisson law
+def synthetic_baskets(n, n_items, seed=0):
+    rng = np.random.default_rng(seed)
+    popularity = 1 / np.arange(1, n_items + 1)
+    sizes = rng.poisson(8, n) + 1
+    items = rng.choice(n_items, size=sizes.sum(), p=popularity / popularity.sum())
+    baskets = np.split(items, np.cumsum(sizes)[:-1])
+    return [list(set(basket.tolist())) for basket in baskets]
+
+
+# Time Apriori against FP-Growth and Eclat on synthetic baskets
+def benchmark(sizes, n_items, support, seed=0):
+    for n in sizes:
+        store = TransactionStore.from_baskets(synthetic_baskets(n, n_items, seed + 1))
+        start = time.perf_counter()
+        apriori(store, max(1, int(support * n)))
+        base = time.perf_counter() - start
+        line = f"n = {n:,}: apriori {base:.2f} s"
+        for name, miner in (('fpgrowth', fp_growth), ('eclat', eclat)):
+            start = time.perf_counter()
+            counts = miner(store, max(1, int(support * n)))
+            elapsed = time.perf_counter() - start
+            line += f", {name} {elapsed:.2f} s ({base / elapsed:.1f}x)"
+        print(line + f", {len(counts)} frequent itemsets")
+
+
+if __name__ == '__main__':
+    if engine == 'benchmark':
+        benchmark(benchmark_sizes, benchmark_items, benchmark_support)
+        raise SystemExit
+
+    if engine == 'son':
+        counts, stats = son(file_path, min_sup, chunksize, workers, transaction_format)
+        print(f"{stats['transactions']} transactions in {stats['partitions']} partitions: "
+              f"{stats['candidates']} local frequent itemsets, {stats['frequent']} frequent\n")
+        n_transactions = stats['transactions']
+        all_frequent_itemsets = sorted(counts, key=lambda itemset: (len(itemset), sorted(map(str, itemset))))
+    else:
+        store = load_transactions(file_path, transaction_format, cache_transactions)
+        n_transactions = len(store)
+    if engine in ('fpgrowth', 'eclat'):
+        counts = (fp_growth if engine == 'fpgrowth' else eclat)(store, min_sup)
+        # Smaller itemsets first
+        all_frequent_itemsets = sorted(counts, key=lambda itemset: (len(itemset), sorted(map(str, itemset))))
+    elif engine != 'son':
+        all_frequent_itemsets, counts, levels = apriori(store, min_sup)
+    rules = rules_from_counts(counts, n_transactions, min_conf, all_frequent_itemsets)
+
+    # Display frequent itemsets
+    print("Frequent Itemsets:")
+    for itemset in all_frequent_itemsets:
+        print(set(itemset))
+
+    # Step 4: Generate and display association rules
+    print("\nAssociation Rules:")
+    for antecedent, consequent, support, confidence in rules:
+        print(f"{set(antecedent)} -> {set(consequent)} (support: {support}, confidence: {confidence})")
+
+    if engine == 'apriori' and report_levels:
+        print("\nApriori Levels:")
+        for level in levels:
+            print(f"k = {level['k']}: {level['generated']} candidates generated, {level['pruned']} pruned, "
+                  f"{level['counted']} counted over {level['transactions']} transactions, "
+                  f"{level['frequent']} frequent")
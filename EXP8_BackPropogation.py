@@ -59,11 +59,64 @@ Output: Final weights, biases, and predicted output
 Notes:
 Adjust the number of neurons, learning rate, and epochs based on your specific problem and dataset.
 Ensure the dataset is in the correct format (input features and target outputs).
+
+MLP Class:
+
+The steps above for any number of layers: layer_sizes lists the neurons of every layer, from the input
+features to the outputs, and layer l has weights (layer_sizes[l-1] x layer_sizes[l]) and biases (1 x layer_sizes[l]),
+drawn uniformly in [0, 1) one layer after another (weights, then biases) from a generator seeded with seed; with
+layer_sizes = [2, 2, 1] and seed = 42 the draws are those of the steps above, so the XOR run is unchanged.
+Buffers: the activations, gradients and weight updates of every layer are arrays allocated once, for the
+largest batch, when training starts. Every step of an epoch writes into them with the out= argument of the NumPy
+functions (np.dot, np.multiply, np.sum, ...) and in-place operators, so an epoch allocates no arrays:
+  sigmoid in place: z = -z, z = exp(z), z = z + 1, z = 1 / z
+  gradient of a layer: delta = error * a * (1 - a), with 1 - a written into the delta buffer and multiplied in
+  place (a scratch buffer holds the error of a hidden layer)
+  update: W += (a_previous.T . delta) * learning_rate, b += sum(delta) * learning_rate
+A smaller last batch uses the first rows of the buffers (views, not copies).
+Mini-batches: with batch_size set, the rows are shuffled in place every epoch and the weights are updated after
+every batch_size rows (gathered into a buffer with np.take); with batch_size = None every epoch is one batch of all
+the rows, as above.
+dtype: np.float64 or np.float32 (half the memory, and faster matrix products); the data and the weights are
+converted once.
+
+Benchmark (engine = 'benchmark'): epochs per second of the script's training loop (steps above, one hidden layer,
+whole dataset per epoch) against the MLP class with float64 and float32 and with mini-batches, on synthetic
+datasets of benchmark_samples rows.
 _____________________________________________________________________________________
 '''
 
+import time
+
 import numpy as np
 
+# Engine:
+#   'mlp' - train the MLP class below on the XOR problem
+#   'benchmark' - epochs per second of the script's loop against the MLP class on synthetic data
+engine = 'mlp'
+
+# Define the neural network structure: neurons of the input layer (number of features in the dataset,
+# e.g. XOR input), of every hidden layer, and of the output layer (e.g. XOR output)
+layer_sizes = [2, 2, 1]
+
+# Define the learning rate and number of epochs
+learning_rate = 0.1
+epochs = 10000
+# Rows per weight update (None = the whole dataset), floating point type, and seed of the initial weights
+batch_size = None
+dtype = np.float64
+seed = 42
+# Print the output after every report_every epochs
+report_every = 1000
+# Benchmark: numbers of rows of the synthetic datasets, features, hidden neurons, epochs timed, and
+# rows per mini-batch
+benchmark_samples = [10**3, 10**4, 10**5]
+benchmark_features = 32
+benchmark_hidden = 64
+benchmark_epochs = 20
+benchmark_batch = 256
+
+
 # Define the sigmoid activation function and its derivative
 def sigmoid(x):
     return 1 / (1 + np.exp(-x))
@@ -71,71 +124,217 @@ def sigmoid(x):
 def sigmoid_derivative(x):
     return x * (1 - x)
 
-# Define the neural network structure
-input_layer_neurons = 2  # Number of features in the dataset (e.g., XOR input)
-hidden_layer_neurons = 2  # Number of neurons in the hidden layer
-output_neurons = 1  # Number of neurons in the output layer (e.g., XOR output)
 
-# Initialize weights and biases
-# Randomly initialize weights and biases for the hidden and output layers
-np.random.seed(42)
-hidden_weights = np.random.uniform(size=(input_layer_neurons, hidden_layer_neurons))
-hidden_bias = np.random.uniform(size=(1, hidden_layer_neurons))
-output_weights = np.random.uniform(size=(hidden_layer_neurons, output_neurons))
-output_bias = np.random.uniform(size=(1, output_neurons))
+# Sigmoid of z, written over z
+def sigmoid_inplace(z):
+    np.negative(z, out=z)
+    # exp overflows to inf for very negative activations, and the sigmoid is then 0 as it should be
+    with np.errstate(over='ignore'):
+        np.exp(z, out=z)
+    z += 1
+    np.reciprocal(z, out=z)
+    return z
 
-# Define the learning rate and number of epochs
-learning_rate = 0.1
-epochs = 10000
 
-# Define the input features and target output for the XOR problem
-inputs = np.array([[0, 0], [0, 1], [1, 0], [1, 1]])
-target_output = np.array([[0], [1], [1], [0]])
-
-# Train the neural network
-for epoch in range(epochs):
-    # Forward propagation
-    # Calculate the activation of the hidden layer
-    hidden_layer_activation = np.dot(inputs, hidden_weights)
-    hidden_layer_activation += hidden_bias
-    hidden_layer_output = sigmoid(hidden_layer_activation)
-
-    # Calculate the activation of the output layer
-    output_layer_activation = np.dot(hidden_layer_output, output_weights)
-    output_layer_activation += output_bias
-    predicted_output = sigmoid(output_layer_activation)
-
-    # Calculate the error
-    error = target_output - predicted_output
-
-    # Backpropagation
-    # Calculate the gradient for the output layer
-    d_predicted_output = error * sigmoid_derivative(predicted_output)
-    
-    # Calculate the error and gradient for the hidden layer
-    error_hidden_layer = d_predicted_output.dot(output_weights.T)
-    d_hidden_layer = error_hidden_layer * sigmoid_derivative(hidden_layer_output)
-
-    # Update weights and biases
-    # Update the weights and biases for the output layer
-    output_weights += hidden_layer_output.T.dot(d_predicted_output) * learning_rate
-    output_bias += np.sum(d_predicted_output, axis=0, keepdims=True) * learning_rate
-    # Update the weights and biases for the hidden layer
-    hidden_weights += inputs.T.dot(d_hidden_layer) * learning_rate
-    hidden_bias += np.sum(d_hidden_layer, axis=0, keepdims=True) * learning_rate
-
-    # Print output after every 1000 epochs
-    if (epoch + 1) % 1000 == 0:
-        print(f"Epoch {epoch + 1}")
-        print("Predicted Output: \n", predicted_output)
-        print("Error: \n", error)
-        print("\n")
-
-# Test the neural network
-print("Final hidden weights: ", hidden_weights)
-print("Final hidden bias: ", hidden_bias)
-print("Final output weights: ", output_weights)
-print("Final output bias: ", output_bias)
-
-print("\nOutput from neural network after 10,000 epochs: ")
-print(predicted_output)
\ No newline at end of file
+# Multi-layer perceptron with sigmoid activations, trained by backpropagation in preallocated buffers
+class MLP:
+    def __init__(self, layer_sizes, dtype=np.float64, seed=42):
+        self.layer_sizes = list(layer_sizes)
+        self.dtype = np.dtype(dtype)
+        # Same draws, in the same order, as np.random.seed(seed) followed by np.random.uniform
+        rng = np.random.RandomState(seed)
+        self.weights, self.biases = [], []
+        for n_in, n_out in zip(self.layer_sizes[:-1], self.layer_sizes[1:]):
+            self.weights.append(rng.uniform(size=(n_in, n_out)).astype(self.dtype))
+            self.biases.append(rng.uniform(size=(1, n_out)).astype(self.dtype))
+        self.rng = rng
+        self.rows = 0
+
+    # Allocate the buffers for batches of up to `rows` rows (once, or again for a larger batch)
+    def allocate(self, rows):
+        if rows <= self.rows:
+            return
+        sizes = self.layer_sizes
+        self.rows = rows
+        self.inputs = np.empty((rows, sizes[0]), dtype=self.dtype)
+        self.targets = np.empty((rows, sizes[-1]), dtype=self.dtype)
+        # Activation (the output of the sigmoid, written over the weighted sum) and gradient of every layer
+        self.activations = [np.empty((rows, n), dtype=self.dtype) for n in sizes[1:]]
+        self.deltas = [np.empty((rows, n), dtype=self.dtype) for n in sizes[1:]]
+        self.scratch = [np.empty((rows, n), dtype=self.dtype) for n in sizes[1:]]
+        self.error = np.empty((rows, sizes[-1]), dtype=self.dtype)
+        self.weight_steps = [np.empty_like(w) for w in self.weights]
+        self.bias_steps = [np.empty_like(b) for b in self.biases]
+
+    # Forward propagation of a batch (rows x features), into the first rows of the activation buffers;
+    # returns the output
+    def forward(self, x):
+        m = len(x)
+        a = x
+        for w, b, activation in zip(self.weights, self.biases, self.activations):
+            z = activation[:m]
+            np.dot(a, w, out=z)
+            z += b
+            a = sigmoid_inplace(z)
+        return a
+
+    # Backpropagation of a batch after forward(x), and update of the weights and biases
+    def backward(self, x, y, learning_rate):
+        m = len(x)
+        layers = len(self.weights)
+        # Calculate the error and the gradient for the output layer
+        output = self.activations[-1][:m]
+        error = np.subtract(y, output, out=self.error[:m])
+        for l in range(layers - 1, -1, -1):
+            a, delta, scratch = self.activations[l][:m], self.deltas[l][:m], self.scratch[l][:m]
+            if l < layers - 1:
+                # Error of a hidden layer: gradient of the next layer times its weights (before the update)
+                error = np.dot(self.deltas[l + 1][:m], self.weights[l + 1].T, out=scratch)
+            # delta = error * sigmoid_derivative(a) = error * (a * (1 - a))
+            derivative = np.subtract(1, a, out=delta)
+            derivative *= a
+            np.multiply(error, derivative, out=delta)
+
+        # Update weights and biases, from the output layer down
+        for l in range(layers - 1, -1, -1):
+            previous = x if l == 0 else self.activations[l - 1][:m]
+            delta = self.deltas[l][:m]
+            step = np.dot(previous.T, delta, out=self.weight_steps[l])
+            step *= learning_rate
+            self.weights[l] += step
+            step = np.sum(delta, axis=0, keepdims=True, out=self.bias_steps[l])
+            step *= learning_rate
+            self.biases[l] += step
+
+    # Train on inputs (rows x features) and targets (rows x outputs). Prints the output and the error
+    # every report_every epochs (0 = never) and returns the output for all the inputs: that of the last
+    # forward pass with a single batch, else a prediction with the trained weights.
+    def fit(self, inputs, targets, epochs, learning_rate, batch_size=None, report_every=0):
+        inputs = np.asarray(inputs, dtype=self.dtype)
+        targets = np.asarray(targets, dtype=self.dtype)
+        n = len(inputs)
+        batch = n if batch_size is None else min(batch_size, n)
+        self.allocate(batch)
+        order = np.arange(n)
+        for epoch in range(epochs):
+            if batch == n:
+                x, y = inputs, targets
+                predicted = self.forward(x)
+                self.backward(x, y, learning_rate)
+            else:
+                self.rng.shuffle(order)
+                for start in range(0, n, batch):
+                    rows = order[start:start + batch]
+                    x = np.take(inputs, rows, axis=0, out=self.inputs[:len(rows)])
+                    y = np.take(targets, rows, axis=0, out=self.targets[:len(rows)])
+                    predicted = self.forward(x)
+                    self.backward(x, y, learning_rate)
+
+            # Print output after every report_every epochs
+            if report_every and (epoch + 1) % report_every == 0:
+                print(f"Epoch {epoch + 1}")
+                if batch == n:
+                    print("Predicted Output: \n", predicted)
+                    print("Error: \n", self.error[:n])
+                else:
+                    print("Mean squared error: ", np.mean((targets - self.predict(inputs)) ** 2))
+                print("\n")
+        if batch == n:
+            return predicted.copy()
+        return self.predict(inputs)
+
+    # Output of the network for inputs (rows x features), batch by batch in the buffers
+    def predict(self, inputs):
+        inputs = np.asarray(inputs, dtype=self.dtype)
+        self.allocate(self.rows or len(inputs))
+        output = np.empty((len(inputs), self.layer_sizes[-1]), dtype=self.dtype)
+        for start in range(0, len(inputs), self.rows):
+            x = inputs[start:start + self.rows]
+            output[start:start + len(x)] = self.forward(x)
+        return output
+
+
+# The script's training loop (one hidden layer, whole dataset per epoch, new arrays at every step),
+# kept as the baseline of the benchmark. Returns the weights and biases and the last output.
+def script_train(inputs, target_output, hidden_layer_neurons, epochs, learning_rate, seed=42):
+    input_layer_neurons, output_neurons = inputs.shape[1], target_output.shape[1]
+    np.random.seed(seed)
+    hidden_weights = np.random.uniform(size=(input_layer_neurons, hidden_layer_neurons))
+    hidden_bias = np.random.uniform(size=(1, hidden_layer_neurons))
+    output_weights = np.random.uniform(size=(hidden_layer_neurons, output_neurons))
+    output_bias = np.random.uniform(size=(1, output_neurons))
+
+    for epoch in range(epochs):
+        # Forward propagation
+        hidden_layer_activation = np.dot(inputs, hidden_weights)
+        hidden_layer_activation += hidden_bias
+        hidden_layer_output = sigmoid(hidden_layer_activation)
+        output_layer_activation = np.dot(hidden_layer_output, output_weights)
+        output_layer_activation += output_bias
+        predicted_output = sigmoid(output_layer_activation)
+
+        # Backpropagation
+        error = target_output - predicted_output
+        d_predicted_output = error * sigmoid_derivative(predicted_output)
+        error_hidden_layer = d_predicted_output.dot(output_weights.T)
+        d_hidden_layer = error_hidden_layer * sigmoid_derivative(hidden_layer_output)
+
+        # Update weights and biases
+        output_weights += hidden_layer_output.T.dot(d_predicted_output) * learning_rate
+        output_bias += np.sum(d_predicted_output, axis=0, keepdims=True) * learning_rate
+        hidden_weights += inputs.T.dot(d_hidden_layer) * learning_rate
+        hidden_bias += np.sum(d_hidden_layer, axis=0, keepdims=True) * learning_rate
+    return hidden_weights, hidden_bias, output_weights, output_bias, predicted_output
+
+
+# Synthetic dataset: standard normal features, and a target of 1 where a random hyperplane of the
+# products of consecutive features is positive (not linearly separable)
+def synthetic_dataset(n, n_features, seed=0):
+    rng = np.random.default_rng(seed)
+    inputs = rng.standard_normal((n, n_features))
+    products = inputs[:, :-1] * inputs[:, 1:]
+    target_output = (products @ rng.standard_normal(n_features - 1) > 0).astype(np.float64)[:, None]
+    return inputs, target_output
+
+
+# Epochs per second of the script's loop against the MLP class (float64, float32, mini-batches)
+def benchmark(sample_sizes, n_features, hidden, n_epochs, batch_rows, learning_rate=0.001, seed=0):
+    for n in sample_sizes:
+        inputs, target_output = synthetic_dataset(n, n_features, seed)
+        start = time.perf_counter()
+        script_train(inputs, target_output, hidden, n_epochs, learning_rate)
+        base = n_epochs / (time.perf_counter() - start)
+        line = f"n = {n:,}: script {base:.1f} epochs/s"
+        for name, float_type, batch in (('float64', np.float64, None), ('float32', np.float32, None),
+                                        (f'float32 batches of {batch_rows}', np.float32, batch_rows)):
+            model = MLP([n_features, hidden, 1], dtype=float_type)
+            start = time.perf_counter()
+            model.fit(inputs, target_output, n_epochs, learning_rate, batch)
+            rate = n_epochs / (time.perf_counter() - start)
+            line += f", {name} {rate:.1f} epochs/s ({rate / base:.1f}x)"
+        print(line)
+
+
+if __name__ == '__main__':
+    if engine == 'benchmark':
+        benchmark(benchmark_samples, benchmark_features, benchmark_hidden, benchmark_epochs, benchmark_batch)
+        raise SystemExit
+
+    # Define the input features and target output for the XOR problem
+    inputs = np.array([[0, 0], [0, 1], [1, 0], [1, 1]])
+    target_output = np.array([[0], [1], [1], [0]])
+
+    # Train the neural network
+    model = MLP(layer_sizes, dtype, seed)
+    predicted_output = model.fit(inputs, target_output, epochs, learning_rate, batch_size, report_every)
+
+    # Test the neural network
+    names = ['hidden'] * (len(model.weights) - 1) + ['output']
+    if len(model.weights) > 2:
+        names[:-1] = [f"hidden {l + 1}" for l in range(len(model.weights) - 1)]
+    for name, weights, bias in zip(names, model.weights, model.biases):
+        print(f"Final {name} weights: ", weights)
+        print(f"Final {name} bias: ", bias)
+
+    print(f"\nOutput from neural network after {epochs:,} epochs: ")
+    print(predicted_output)